@@ -1,14 +1,39 @@
-from flask import Flask, jsonify, request, render_template, send_file
+from flask import Flask, jsonify, request, render_template, send_file, Response, stream_with_context
 from flask_cors import CORS
 import subprocess
 import json
 import socket
 import requests
+import nl80211
+from blocklist import normalize_domain, parse_blocklist_lines, domain_hash, BLOCKLIST_MAGIC
 from datetime import datetime
 import re
 import ipaddress
 import platform
 import os
+import sys
+import mmap
+import hashlib
+import bisect
+import math
+import csv
+import sqlite3
+import asyncio
+import random
+import struct
+import unicodedata
+from array import array
+import threading
+import queue
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    # Optional: batch threat scoring falls back to a per-network loop
+    np = None
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 CORS(app)
@@ -24,38 +49,1294 @@ THREAT_KEYWORDS = [
     'exploit', 'backdoor', 'spyware', 'adware', 'scareware'
 ]
 
+# Frequently impersonated domains checked for look-alikes (typosquats, homoglyphs)
+PROTECTED_DOMAINS = [
+    'paypal.com', 'google.com', 'apple.com', 'microsoft.com', 'amazon.com',
+    'facebook.com', 'instagram.com', 'netflix.com', 'linkedin.com', 'github.com',
+    'dropbox.com', 'outlook.com', 'office.com', 'icloud.com', 'yahoo.com',
+    'whatsapp.com', 'chase.com', 'wellsfargo.com', 'bankofamerica.com', 'coinbase.com'
+]
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: finds the best pattern in one pass over the text"""
+    
+    def __init__(self, patterns):
+        # patterns: iterable of (pattern, value); value is reported for each match
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        # Smallest value ending at this node or any of its suffixes
+        self._best = [None]
+        self.size = 0
+        
+        for pattern, value in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._best.append(None)
+                node = nxt
+            self._out[node].append((pattern, value))
+            self.size += 1
+        
+        self._build_links()
+    
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        for node in queue:
+            self._best[node] = min((v for _, v in self._out[node]), default=None)
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[child] = fail
+                own = min((v for _, v in self._out[child]), default=None)
+                inherited = self._best[fail]
+                if own is None or (inherited is not None and inherited < own):
+                    own = inherited
+                self._best[child] = own
+                queue.append(child)
+    
+    @property
+    def states(self):
+        return len(self._goto)
+    
+    def _step(self, node, ch):
+        goto = self._goto
+        while node and ch not in goto[node]:
+            node = self._fail[node]
+        return goto[node].get(ch, 0)
+    
+    def best_match(self, text):
+        """Return the smallest value among all patterns occurring in text, or None"""
+        best = None
+        node = 0
+        for ch in text:
+            node = self._step(node, ch)
+            value = self._best[node]
+            if value is not None and (best is None or value < best):
+                best = value
+        return best
+
+class DomainIndex:
+    """Suffix trie over reversed DNS labels for exact and parent-domain matching"""
+    
+    # Key marking the end of a blocklisted domain; labels are never empty
+    _END = ""
+    
+    def __init__(self, domains=()):
+        self._root = {}
+        self.size = 0
+        self.nodes = 1
+        self._memory = None
+        for domain in domains:
+            self.add(domain)
+    
+    def add(self, domain):
+        labels = normalize_domain(domain).split('.')
+        if not labels or not all(labels):
+            return
+        node = self._root
+        for label in reversed(labels):
+            child = node.get(label)
+            if child is None:
+                # Interning shares label strings such as "com" across entries
+                child = node[sys.intern(label)] = {}
+                self.nodes += 1
+            node = child
+        if self._END not in node:
+            self.size += 1
+        node[self._END] = domain
+        self._memory = None
+    
+    def match(self, domain):
+        """Return the blocklisted entry equal to domain or a parent of it, or None"""
+        node = self._root
+        for label in reversed(normalize_domain(domain).split('.')):
+            node = node.get(label)
+            if node is None:
+                return None
+            entry = node.get(self._END)
+            if entry is not None:
+                return entry
+        return None
+    
+    def iter_hashes(self):
+        """Yield domain_hash() of every normalized entry"""
+        stack = [(self._root, "")]
+        while stack:
+            node, suffix = stack.pop()
+            for label, child in node.items():
+                if label == self._END:
+                    yield domain_hash(suffix)
+                else:
+                    stack.append((child, label + "." + suffix if suffix else label))
+    
+    def memory_bytes(self):
+        """Approximate memory held by the trie's dicts (cached until the next add)"""
+        if self._memory is not None:
+            return self._memory
+        total = 0
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            total += sys.getsizeof(node)
+            stack.extend(child for key, child in node.items() if key != self._END)
+        self._memory = total
+        return total
+    
+    def get_stats(self):
+        return {"entries": self.size, "nodes": self.nodes, "memory_bytes": self.memory_bytes()}
+
+class MmapDomainIndex:
+    """Read-only compiled blocklist shared between workers through the page cache"""
+    
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != BLOCKLIST_MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a compiled blocklist")
+        self.size = int.from_bytes(self._mm[8:16], 'little')
+        if sys.byteorder != 'little':
+            raise ValueError("Compiled blocklists require a little-endian host")
+        # Indexing the cast view reads hashes straight from the mapped pages
+        self._hashes = memoryview(self._mm)[16:16 + 8 * self.size].cast('Q')
+    
+    def _contains(self, value):
+        index = bisect.bisect_left(self._hashes, value)
+        return index < self.size and self._hashes[index] == value
+    
+    def match(self, domain):
+        """Return the listed domain equal to domain or a parent of it, or None
+        
+        The table is never copied into Python objects; a lookup only allocates the
+        normalized name, its parent suffixes and one 8-byte hash per label.
+        """
+        domain = normalize_domain(domain)
+        while domain:
+            if self._contains(domain_hash(domain)):
+                return domain
+            dot = domain.find('.')
+            if dot < 0:
+                return None
+            domain = domain[dot + 1:]
+        return None
+    
+    def iter_hashes(self):
+        return iter(self._hashes)
+    
+    def get_stats(self):
+        return {"entries": self.size, "path": self.path, "file_bytes": len(self._mm), "memory_bytes": 0, "shared": True}
+
+def build_threat_matcher(keywords=None):
+    """Compile threat keywords into one automaton
+    
+    Values are (position, keyword) so the smallest match is the first
+    keyword in list order, as with the original loop.
+    """
+    keywords = THREAT_KEYWORDS if keywords is None else keywords
+    return AhoCorasick((k.lower(), (i, k)) for i, k in enumerate(keywords))
+
+# Compiled blocklist shared by all workers (see compile_blocklist.py)
+BLOCKLIST_FILE = os.environ.get('BLOCKLIST_FILE')
+
+class CombinedDomainIndex:
+    """Several domain indexes queried in order (e.g. compiled file plus feed entries)"""
+    
+    def __init__(self, indexes):
+        self.indexes = indexes
+        self.size = sum(index.size for index in indexes)
+    
+    def match(self, domain):
+        for index in self.indexes:
+            entry = index.match(domain)
+            if entry is not None:
+                return entry
+        return None
+    
+    def iter_hashes(self):
+        for index in self.indexes:
+            yield from index.iter_hashes()
+    
+    def get_stats(self):
+        return {"entries": self.size, "indexes": [index.get_stats() for index in self.indexes]}
+
+def build_domain_index(extra_domains=()):
+    """Build the blocklist index from MALICIOUS_DOMAINS and feed entries, plus BLOCKLIST_FILE if set"""
+    if BLOCKLIST_FILE:
+        # The built-in list is added here, so compiled files only hold feed domains
+        index = CombinedDomainIndex([MmapDomainIndex(BLOCKLIST_FILE),
+                                     DomainIndex(list(MALICIOUS_DOMAINS) + list(extra_domains))])
+    else:
+        index = DomainIndex(list(MALICIOUS_DOMAINS) + list(extra_domains))
+    return index
+
+class ThreatIndex:
+    """One generation of the domain index and keyword automaton, swapped as a unit"""
+    
+    def __init__(self, domains, keywords, generation=1, build_seconds=0.0):
+        self.domains = domains
+        self.keywords = keywords
+        self.generation = generation
+        self.build_seconds = build_seconds
+        self.built_at = datetime.now().isoformat()
+    
+    def get_stats(self):
+        return {
+            "generation": self.generation,
+            "built_at": self.built_at,
+            "build_seconds": round(self.build_seconds, 4),
+            "domain_entries": self.domains.size,
+            "keyword_patterns": self.keywords.size
+        }
+
+threat_index = ThreatIndex(build_domain_index(), build_threat_matcher())
+_threat_index_lock = threading.Lock()
+
+def rebuild_threat_index(extra_domains=(), extra_keywords=()):
+    """Build a new index generation off the request path and swap it in atomically"""
+    global threat_index
+    start = time.perf_counter()
+    domains = build_domain_index(extra_domains)
+    keywords = build_threat_matcher(list(THREAT_KEYWORDS) + list(extra_keywords))
+    build_seconds = time.perf_counter() - start
+    with _threat_index_lock:
+        # Requests read the global once, so they see either the old or the new generation
+        threat_index = ThreatIndex(domains, keywords, threat_index.generation + 1, build_seconds)
+    return threat_index
+
+def load_feed_file(path, column='domain'):
+    """Read entries from a plain-text, hosts-file or CSV feed"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        if path.lower().endswith('.csv'):
+            rows = [row for row in csv.reader(f) if row and not row[0].startswith('#')]
+            if not rows:
+                return []
+            header = [cell.strip().lower() for cell in rows[0]]
+            if column in header:
+                position = header.index(column)
+                rows = rows[1:]
+            else:
+                position = 0
+            lines = [row[position] for row in rows if len(row) > position]
+        else:
+            lines = f.readlines()
+    
+    if column == 'keyword':
+        return [k.split('#', 1)[0].strip().lower() for k in lines if k.split('#', 1)[0].strip()]
+    return list(parse_blocklist_lines(lines))
+
+# Threat feed files (os.pathsep separated) and how often to check them for changes
+THREAT_FEED_DOMAINS = [p for p in os.environ.get('THREAT_FEED_DOMAINS', '').split(os.pathsep) if p]
+THREAT_FEED_KEYWORDS = [p for p in os.environ.get('THREAT_FEED_KEYWORDS', '').split(os.pathsep) if p]
+FEED_POLL_INTERVAL = float(os.environ.get('FEED_POLL_INTERVAL', 30))
+
+class ThreatFeedManager:
+    """Watches feed files and hot-swaps the threat index when they change"""
+    
+    def __init__(self, domain_paths=THREAT_FEED_DOMAINS, keyword_paths=THREAT_FEED_KEYWORDS,
+                 interval=FEED_POLL_INTERVAL):
+        self.domain_paths = list(domain_paths)
+        self.keyword_paths = list(keyword_paths)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._signatures = {}
+        self.feeds = {}
+        self.last_error = None
+        self.reload_count = 0
+    
+    def watched_paths(self):
+        paths = self.domain_paths + self.keyword_paths
+        if BLOCKLIST_FILE:
+            paths.append(BLOCKLIST_FILE)
+        return paths
+    
+    def _signature(self, path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+    
+    def start(self):
+        """Start the watcher thread (once per worker process)"""
+        if not self.watched_paths():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="feed-watcher", daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+    
+    def check(self):
+        """Reload if any watched file changed since the last load"""
+        signatures = {path: self._signature(path) for path in self.watched_paths()}
+        if signatures != self._signatures:
+            return self.reload(signatures)
+        return False
+    
+    def reload(self, signatures=None):
+        """Load every feed, build a new index generation and swap it in"""
+        if signatures is None:
+            signatures = {path: self._signature(path) for path in self.watched_paths()}
+        try:
+            feeds = {}
+            domains, keywords = [], []
+            for path in self.domain_paths:
+                entries = load_feed_file(path, 'domain')
+                feeds[path] = {"type": "domains", "entries": len(entries)}
+                domains.extend(entries)
+            for path in self.keyword_paths:
+                entries = load_feed_file(path, 'keyword')
+                feeds[path] = {"type": "keywords", "entries": len(entries)}
+                keywords.extend(entries)
+            rebuild_threat_index(domains, keywords)
+        except Exception as e:
+            # Keep serving the previous generation
+            self.last_error = f"{datetime.now().isoformat()}: {e}"
+            self._signatures = signatures
+            return False
+        
+        self._signatures = signatures
+        self.feeds = feeds
+        self.last_error = None
+        self.reload_count += 1
+        return True
+    
+    def get_stats(self):
+        stats = threat_index.get_stats()
+        stats.update({
+            "feeds": self.feeds,
+            "reload_count": self.reload_count,
+            "poll_interval": self.interval,
+            "watching": self._thread is not None and self._thread.is_alive(),
+            "last_error": self.last_error
+        })
+        return stats
+
+feed_manager = ThreatFeedManager()
+if feed_manager.domain_paths or feed_manager.keyword_paths:
+    feed_manager.reload()
+
+# Extra protected names for look-alike detection (one per line), the shortest protected
+# skeleton for which a one-edit difference still counts (shorter names need a homoglyph),
+# and the shortest one for which an inserted letter that doubles nothing counts
+LOOKALIKE_DOMAINS = os.environ.get('LOOKALIKE_DOMAINS')
+LOOKALIKE_SSIDS = os.environ.get('LOOKALIKE_SSIDS')
+LOOKALIKE_MIN_EDIT_LENGTH = int(os.environ.get('LOOKALIKE_MIN_EDIT_LENGTH', 6))
+LOOKALIKE_MIN_INSERT_LENGTH = int(os.environ.get('LOOKALIKE_MIN_INSERT_LENGTH', 7))
+
+# Characters that render alike, folded onto one representative before names are compared
+HOMOGLYPHS = str.maketrans({
+    '0': 'o', '1': 'l', 'i': 'l', '|': 'l', '!': 'l', '3': 'e', '4': 'a', '@': 'a',
+    '5': 's', '$': 's', '7': 't', '8': 'b',
+    # Cyrillic
+    'а': 'a', 'в': 'b', 'е': 'e', 'о': 'o', 'р': 'p', 'с': 'c', 'у': 'y', 'х': 'x',
+    'і': 'l', 'ј': 'j', 'ԁ': 'd', 'ѕ': 's', 'һ': 'h', 'ӏ': 'l', 'к': 'k', 'м': 'm', 'т': 't',
+    # Greek
+    'α': 'a', 'β': 'b', 'ε': 'e', 'ι': 'l', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p', 'τ': 't', 'υ': 'u', 'χ': 'x',
+})
+HOMOGLYPH_SEQUENCES = (('rn', 'm'), ('vv', 'w'))
+
+def skeleton(name):
+    """Homoglyph-folded form of a name: case-folded, accents and separators removed"""
+    text = unicodedata.normalize('NFKD', name.casefold())
+    text = ''.join(c for c in text if not unicodedata.combining(c)).translate(HOMOGLYPHS)
+    for sequence, replacement in HOMOGLYPH_SEQUENCES:
+        text = text.replace(sequence, replacement)
+    return ''.join(c for c in text if c.isalnum())
+
+def deletion_variants(text):
+    """The text and every string one character deletion away from it"""
+    variants = {text}
+    for i in range(len(text)):
+        variants.add(text[:i] + text[i + 1:])
+    return variants
+
+def lookalike_distance(name, protected, min_insert_length=LOOKALIKE_MIN_INSERT_LENGTH):
+    """0 if equal, 1 if one substitution, adjacent swap, or easily missed insert/delete apart, else 2
+    
+    A dropped character or a doubled/undoubled letter (amazn, gooogle, paypall) is easy
+    to miss. A new letter added to a short name mostly turns one real word into another
+    (office/officer, apple/apples, chase/chased), so it only counts for protected names
+    of at least min_insert_length characters (netflixs).
+    """
+    if name == protected:
+        return 0
+    if abs(len(name) - len(protected)) > 1:
+        return 2
+    i = 0
+    while i < len(name) and i < len(protected) and name[i] == protected[i]:
+        i += 1
+    if len(name) == len(protected):
+        # Everything after the first difference must line up again
+        if name[i + 1:] == protected[i + 1:]:
+            return 1
+        if i + 1 < len(name) and name[i] == protected[i + 1] and name[i + 1] == protected[i] and name[i + 2:] == protected[i + 2:]:
+            return 1
+        return 2
+    longer, shorter = (name, protected) if len(name) > len(protected) else (protected, name)
+    if longer[i + 1:] != shorter[i:]:
+        return 2
+    # longer[i] is the extra character; i is the first mismatch, so a letter it doubles precedes it
+    if i > 0 and longer[i - 1] == longer[i]:
+        return 1
+    if len(name) < len(protected) or len(protected) >= min_insert_length:
+        return 1
+    return 2
+
+class LookalikeIndex:
+    """Finds protected names within one lookalike_distance() edit of a query, after homoglyph folding
+    
+    Every protected skeleton is stored under the hashes of its one-deletion variants
+    in a sorted array. Two strings one edit apart share a variant (one of them may be
+    the string itself), so a query does len+1 binary searches instead of comparing every name.
+    """
+    
+    def __init__(self, names=(), min_edit_length=LOOKALIKE_MIN_EDIT_LENGTH):
+        self.min_edit_length = min_edit_length
+        self.names = []
+        self.skeletons = []
+        entries = []
+        for name in names:
+            folded = skeleton(name)
+            if not folded:
+                continue
+            position = len(self.names)
+            self.names.append(name)
+            self.skeletons.append(folded)
+            entries.extend((hash(variant), position) for variant in deletion_variants(folded))
+        entries.sort()
+        self._keys = array('q', [key for key, _ in entries])
+        self._positions = array('i', [position for _, position in entries])
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def nearest(self, name):
+        """Protected names that look like name, closest first, as (distance, protected name)"""
+        folded = skeleton(name)
+        if not folded or not self.names:
+            return []
+        keys = self._keys
+        candidates = set()
+        for variant in deletion_variants(folded):
+            key = hash(variant)
+            i = bisect.bisect_left(keys, key)
+            while i < len(keys) and keys[i] == key:
+                candidates.add(self._positions[i])
+                i += 1
+        
+        query = name.casefold()
+        matches = []
+        for position in candidates:
+            protected = self.names[position]
+            if protected.casefold() == query:
+                # The protected name itself is not a look-alike
+                continue
+            protected_skeleton = self.skeletons[position]
+            distance = lookalike_distance(folded, protected_skeleton)
+            if distance == 0 or (distance == 1 and len(protected_skeleton) >= self.min_edit_length):
+                matches.append((distance, protected))
+        matches.sort()
+        return matches
+    
+    def memory_bytes(self):
+        return self._keys.itemsize * len(self._keys) + self._positions.itemsize * len(self._positions)
+    
+    def get_stats(self):
+        return {"names": len(self.names), "entries": len(self._keys), "memory_bytes": self.memory_bytes()}
+
+def read_name_list(path):
+    """Non-empty, non-comment lines of a name list file"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+    except OSError:
+        return []
+
+class DomainLookalikes:
+    """Look-alike checks for domains against the registrable label of protected domains"""
+    
+    def __init__(self, domains):
+        self.domains = {}
+        for domain in domains:
+            domain = normalize_domain(domain)
+            if domain.startswith('www.'):
+                domain = domain[4:]
+            if '.' in domain:
+                self.domains.setdefault(domain.split('.', 1)[0], domain)
+        self.protected = set(self.domains.values())
+        self.index = LookalikeIndex(self.domains)
+    
+    def match(self, domain):
+        """Return {"lookalike_of", "distance"} for the closest impersonated domain, or None"""
+        labels = normalize_domain(domain).split('.')
+        # The protected domains and their subdomains are the real thing
+        for i in range(len(labels) - 1):
+            if '.'.join(labels[i:]) in self.protected:
+                return None
+        best = None
+        # Every label but the TLD may carry the imitation (paypa1.com, login.paypa1.com.evil.net)
+        for label in labels[:-1]:
+            if label in self.domains:
+                # A protected label under someone else's domain (paypal.net, paypal.com.evil.net)
+                return {"lookalike_of": self.domains[label], "distance": 0}
+            for distance, protected_label in self.index.nearest(label):
+                if best is None or distance < best["distance"]:
+                    best = {"lookalike_of": self.domains[protected_label], "distance": distance}
+                break
+        return best
+    
+    def get_stats(self):
+        return dict(self.index.get_stats(), kind="domain")
+
+domain_lookalikes = DomainLookalikes(PROTECTED_DOMAINS + (read_name_list(LOOKALIKE_DOMAINS) if LOOKALIKE_DOMAINS else []))
+ssid_lookalikes = LookalikeIndex(read_name_list(LOOKALIKE_SSIDS) if LOOKALIKE_SSIDS else [])
+
+# Batch domain check limits
+DOMAIN_BATCH_WORKERS = int(os.environ.get('DOMAIN_BATCH_WORKERS', 16))
+DOMAIN_BATCH_LIMIT = int(os.environ.get('DOMAIN_BATCH_LIMIT', 50000))
+
+# DNS resolver backend: "blocking" (socket.gethostbyname) or "async" (non-blocking UDP client)
+DNS_RESOLVER = os.environ.get('DNS_RESOLVER', 'blocking').lower()
+DNS_TIMEOUT = float(os.environ.get('DNS_TIMEOUT', 3))
+DNS_ASYNC_CONCURRENCY = int(os.environ.get('DNS_ASYNC_CONCURRENCY', 256))
+
+class BlockingResolver:
+    """Resolve with socket.gethostbyname; batches run on a thread pool"""
+    
+    name = "blocking"
+    
+    def __init__(self, workers=DOMAIN_BATCH_WORKERS, note=None):
+        self.workers = workers
+        self.note = note
+    
+    def resolve(self, domain):
+        """Return the IPv4 address for domain, or None if it does not resolve"""
+        try:
+            return socket.gethostbyname(domain)
+        except Exception:
+            return None
+    
+    async def resolve_async(self, domain):
+        """Await a lookup without blocking the event loop (getaddrinfo runs on its executor)"""
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(domain, None, family=socket.AF_INET,
+                                                                  type=socket.SOCK_STREAM)
+        except Exception:
+            return None
+        return infos[0][4][0] if infos else None
+    
+    def resolve_many(self, domains):
+        if len(domains) <= 1:
+            return [self.resolve(d) for d in domains]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(domains))) as pool:
+            return list(pool.map(self.resolve, domains))
+    
+    def get_stats(self):
+        stats = {"backend": self.name, "workers": self.workers}
+        if self.note:
+            stats["note"] = self.note
+        return stats
+
+class _DNSQueryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, query_id, future):
+        self.query_id = query_id
+        self.future = future
+    
+    def datagram_received(self, data, addr):
+        # Ignore stray or spoofed packets that don't carry our query id
+        if len(data) >= 12 and struct.unpack_from('!H', data)[0] == self.query_id and not self.future.done():
+            self.future.set_result(data)
+    
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+class AsyncResolver:
+    """Non-blocking A-record resolver running many lookups on one asyncio loop"""
+    
+    name = "async"
+    
+    def __init__(self, timeout=DNS_TIMEOUT, concurrency=DNS_ASYNC_CONCURRENCY,
+                 nameservers=None, hosts_path='/etc/hosts'):
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.nameservers = nameservers or self.read_nameservers()
+        if not self.nameservers:
+            raise ValueError("no nameservers in /etc/resolv.conf")
+        self.hosts = self.read_hosts(hosts_path)
+        self.stats = {"queries": 0, "timeouts": 0, "errors": 0}
+        self._loop = None
+        self._semaphore = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def read_nameservers(path='/etc/resolv.conf'):
+        servers = []
+        try:
+            with open(path) as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) >= 2 and parts[0] == 'nameserver':
+                        servers.append(parts[1])
+        except OSError:
+            pass
+        return servers
+    
+    @staticmethod
+    def read_hosts(path):
+        hosts = {}
+        try:
+            with open(path) as f:
+                for line in f:
+                    parts = line.split('#', 1)[0].split()
+                    if len(parts) >= 2 and '.' in parts[0]:
+                        for name in parts[1:]:
+                            hosts.setdefault(name.lower(), parts[0])
+        except OSError:
+            pass
+        return hosts
+    
+    def _ensure_loop(self):
+        # One loop thread per worker process, started on first use
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._loop = asyncio.new_event_loop()
+                self._semaphore = None
+                threading.Thread(target=self._loop.run_forever, name="dns-resolver", daemon=True).start()
+        return self._loop
+    
+    def resolve(self, domain):
+        """Return the IPv4 address for domain, or None if it does not resolve"""
+        return self.resolve_many([domain])[0]
+    
+    def resolve_many(self, domains):
+        """Resolve all domains concurrently on the resolver loop, keeping input order"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._gather(domains), loop)
+        return future.result()
+    
+    async def _gather(self, domains):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*(self._resolve(d) for d in domains))
+    
+    async def resolve_async(self, domain):
+        """Await one lookup from any event loop; the query itself runs on the resolver loop"""
+        future = asyncio.run_coroutine_threadsafe(self._gather([domain]), self._ensure_loop())
+        return (await asyncio.wrap_future(future))[0]
+    
+    async def _resolve(self, domain):
+        """Coroutine resolving one domain; each nameserver attempt has its own timeout"""
+        name = domain.strip().lower().rstrip('.')
+        try:
+            ipaddress.IPv4Address(name)
+            return name
+        except ValueError:
+            pass
+        if name in self.hosts:
+            return self.hosts[name]
+        try:
+            qname = b''.join(bytes([len(label)]) + label for label in name.encode('idna').split(b'.')) + b'\x00'
+        except (UnicodeError, ValueError):
+            return None
+        if not name or len(qname) > 255:
+            return None
+        
+        async with self._semaphore:
+            for server in self.nameservers:
+                self.stats["queries"] += 1
+                try:
+                    # wait_for cancels the query (and closes its socket) on timeout
+                    response = await asyncio.wait_for(self._query(server, qname), self.timeout)
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    continue
+                except (OSError, ValueError):
+                    self.stats["errors"] += 1
+                    continue
+                return self.parse_response(response)
+        return None
+    
+    async def _query(self, server, qname):
+        loop = asyncio.get_running_loop()
+        query_id = random.getrandbits(16)
+        # Header: id, flags (recursion desired), 1 question; then QTYPE A, QCLASS IN
+        packet = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0) + qname + struct.pack('!HH', 1, 1)
+        future = loop.create_future()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DNSQueryProtocol(query_id, future), remote_addr=(server, 53))
+        try:
+            transport.sendto(packet)
+            return await future
+        finally:
+            transport.close()
+    
+    @staticmethod
+    def _skip_name(data, offset):
+        while True:
+            length = data[offset]
+            if length == 0:
+                return offset + 1
+            if length & 0xC0 == 0xC0:
+                # Compression pointer ends the name
+                return offset + 2
+            offset += length + 1
+    
+    @classmethod
+    def parse_response(cls, data):
+        """Return the first A record in a DNS response, or None (NXDOMAIN, no data)"""
+        try:
+            _, flags, qdcount, ancount, _, _ = struct.unpack_from('!HHHHHH', data)
+            if flags & 0x000F:
+                return None
+            offset = 12
+            for _ in range(qdcount):
+                offset = cls._skip_name(data, offset) + 4
+            for _ in range(ancount):
+                offset = cls._skip_name(data, offset)
+                rtype, _, _, rdlength = struct.unpack_from('!HHIH', data, offset)
+                offset += 10
+                if rtype == 1 and rdlength == 4:
+                    return socket.inet_ntoa(data[offset:offset + 4])
+                offset += rdlength
+        except (struct.error, IndexError):
+            pass
+        return None
+    
+    def get_stats(self):
+        return dict(self.stats, backend=self.name, nameservers=self.nameservers,
+                    timeout=self.timeout, concurrency=self.concurrency)
+
+def build_resolver(backend=DNS_RESOLVER):
+    if backend == 'async':
+        try:
+            return AsyncResolver()
+        except ValueError as e:
+            # e.g. Windows has no /etc/resolv.conf: keep resolving through the OS
+            return BlockingResolver(note=f"DNS_RESOLVER=async unavailable ({e}), using blocking")
+    return BlockingResolver()
+
+# DNS resolution cache settings
+DNS_CACHE_SIZE = int(os.environ.get('DNS_CACHE_SIZE', 10000))
+DNS_CACHE_TTL = float(os.environ.get('DNS_CACHE_TTL', 300))
+DNS_NEGATIVE_TTL = float(os.environ.get('DNS_NEGATIVE_TTL', 60))
+
+class DNSCache:
+    """Thread-safe LRU cache of domain resolutions with separate TTLs for failures"""
+    
+    def __init__(self, max_size=DNS_CACHE_SIZE, ttl=DNS_CACHE_TTL, negative_ttl=DNS_NEGATIVE_TTL, resolver=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.resolver = resolver or build_resolver()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "negative_hits": 0, "evictions": 0, "expirations": 0}
+    
+    def _lookup(self, key):
+        """Return (found, address) from the cache, counting hits and misses"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                address, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    if address is None:
+                        self.stats["negative_hits"] += 1
+                    return True, address
+                del self._entries[key]
+                self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+        return False, None
+    
+    def resolve(self, domain):
+        """Return the cached IP for domain, or None if it does not resolve"""
+        key = domain.lower().rstrip('.')
+        found, address = self._lookup(key)
+        if found:
+            return address
+        
+        # Resolve outside the lock so slow lookups don't block cache hits
+        address = self.resolver.resolve(domain)
+        self.store(key, address)
+        return address
+    
+    async def resolve_async(self, domain):
+        """Coroutine version of resolve() for the ASGI handlers"""
+        key = domain.lower().rstrip('.')
+        found, address = self._lookup(key)
+        if found:
+            return address
+        address = await self.resolver.resolve_async(domain)
+        self.store(key, address)
+        return address
+    
+    def resolve_many(self, domains):
+        """Resolve a list of domains, sending only cache misses to the resolver"""
+        results = [None] * len(domains)
+        missing = []
+        for index, domain in enumerate(domains):
+            found, address = self._lookup(domain.lower().rstrip('.'))
+            if found:
+                results[index] = address
+            else:
+                missing.append(index)
+        
+        if missing:
+            addresses = self.resolver.resolve_many([domains[i] for i in missing])
+            for index, address in zip(missing, addresses):
+                self.store(domains[index], address)
+                results[index] = address
+        return results
+    
+    def store(self, domain, address):
+        """Cache a resolution result (address None means resolution failed)"""
+        key = domain.lower().rstrip('.')
+        ttl = self.ttl if address is not None else self.negative_ttl
+        with self._lock:
+            self._entries[key] = (address, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["max_size"] = self.max_size
+        stats["ttl"] = self.ttl
+        stats["negative_ttl"] = self.negative_ttl
+        stats["resolver"] = self.resolver.get_stats()
+        return stats
+
+dns_cache = DNSCache()
+
+# Probe backend: "subprocess" runs the real commands, "replay" serves recorded outputs
+PROBE_BACKEND = os.environ.get('PROBE_BACKEND', 'subprocess').lower()
+PROBE_FIXTURES = os.environ.get('PROBE_FIXTURES', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'probes', 'linux'))
+PROBE_PLATFORM = os.environ.get('PROBE_PLATFORM', 'Linux')
+PROBE_LATENCY = float(os.environ.get('PROBE_LATENCY', 0))
+PROBE_FAILURE_RATE = float(os.environ.get('PROBE_FAILURE_RATE', 0))
+PROBE_RECORD_DIR = os.environ.get('PROBE_RECORD_DIR')
+
+class ProbeBackend:
+    """Runs the named system probes (commands and file reads) the analyzer depends on"""
+    
+    name = "base"
+    # True when probes hit the real system (enables nl80211 auto-detection)
+    live = False
+    platform = platform.system()
+    
+    def run(self, probe, args):
+        """Return the stdout of a command; raise OSError if it cannot run"""
+        raise NotImplementedError
+    
+    def read_file(self, probe, path):
+        """Return the bytes of a system file; raise OSError if unavailable"""
+        raise NotImplementedError
+    
+    async def run_async(self, probe, args):
+        """Coroutine version of run(); by default runs it on the loop's executor"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.run, probe, args)
+    
+    def get_stats(self):
+        return {"backend": self.name, "platform": self.platform}
+
+class SubprocessProbe(ProbeBackend):
+    """Real probes via subprocess.run and the filesystem"""
+    
+    name = "subprocess"
+    live = True
+    
+    def __init__(self, record_dir=PROBE_RECORD_DIR, timeout=10):
+        self.record_dir = record_dir
+        self.timeout = timeout
+    
+    def run(self, probe, args):
+        result = subprocess.run(
+            args,
+            capture_output=True,
+            text=True,
+            timeout=self.timeout
+        )
+        output = result.stdout if result.stdout else ""
+        self._record(probe, output.encode('utf-8'))
+        return output
+    
+    async def run_async(self, probe, args):
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(args, self.timeout)
+        self._record(probe, stdout)
+        return stdout.decode('utf-8', 'replace')
+    
+    def read_file(self, probe, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        self._record(probe, data)
+        return data
+    
+    def _record(self, probe, data):
+        # Capture outputs so the replay backend can serve them later
+        if self.record_dir:
+            os.makedirs(self.record_dir, exist_ok=True)
+            with open(os.path.join(self.record_dir, probe + '.txt'), 'wb') as f:
+                f.write(data)
+
+class ReplayProbe(ProbeBackend):
+    """Serves recorded probe outputs with configurable latency and failure rate"""
+    
+    name = "replay"
+    
+    def __init__(self, fixture_dir=PROBE_FIXTURES, platform_name=PROBE_PLATFORM,
+                 latency=PROBE_LATENCY, failure_rate=PROBE_FAILURE_RATE, seed=None):
+        self.fixture_dir = fixture_dir
+        self.platform = platform_name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "missing": 0}
+    
+    def _serve(self, probe, delay=True):
+        with self._lock:
+            self.stats["calls"] += 1
+            fail = self.failure_rate and self._random.random() < self.failure_rate
+            if fail:
+                self.stats["failures"] += 1
+        if self.latency and delay:
+            time.sleep(self.latency)
+        if fail:
+            raise OSError(f"replayed failure for probe {probe}")
+        
+        data = self._cache.get(probe)
+        if data is None:
+            path = os.path.join(self.fixture_dir, probe + '.txt')
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                with self._lock:
+                    self.stats["missing"] += 1
+                # Behave like a missing command
+                raise FileNotFoundError(f"no recording for probe {probe} in {self.fixture_dir}")
+            self._cache[probe] = data
+        return data
+    
+    def run(self, probe, args):
+        return self._serve(probe).decode('utf-8', 'replace')
+    
+    async def run_async(self, probe, args):
+        # Simulated latency must not block the event loop either
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._serve(probe, delay=False).decode('utf-8', 'replace')
+    
+    def read_file(self, probe, path):
+        return self._serve(probe)
+    
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(backend=self.name, platform=self.platform, fixtures=self.fixture_dir,
+                     latency=self.latency, failure_rate=self.failure_rate)
+        return stats
+
+def build_probe(backend=PROBE_BACKEND):
+    if backend == 'replay':
+        return ReplayProbe()
+    return SubprocessProbe()
+
+probe_backend = build_probe()
+
+# Windows has no cheap change signal for the routing table, so cache for a while
+GATEWAY_CACHE_TTL = float(os.environ.get('GATEWAY_CACHE_TTL', 60))
+
+def parse_proc_route(data):
+    """Return the default IPv4 gateway from /proc/net/route contents, or None"""
+    for line in data.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 8:
+            continue
+        destination, gateway, flags, mask = fields[1], fields[2], int(fields[3], 16), fields[7]
+        # RTF_UP (0x1) and RTF_GATEWAY (0x2) on the 0.0.0.0/0 route
+        if destination == '00000000' and mask == '00000000' and flags & 0x3 == 0x3:
+            # Addresses are stored as host-order (little-endian) hex
+            return socket.inet_ntoa(struct.pack('<L', int(gateway, 16)))
+    return None
+
+class GatewayCache:
+    """Default gateway lookup, re-parsed only when the routing table changes"""
+    
+    def __init__(self, route_path='/proc/net/route', ttl=GATEWAY_CACHE_TTL):
+        self.route_path = route_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._key = None
+        self._gateway = None
+        self._expires = 0.0
+    
+    def get(self, probe, is_windows=False):
+        if is_windows:
+            return self._get_windows(probe)
+        try:
+            # Reading procfs is a couple of syscalls; parse only if the table changed
+            data = probe.read_file('proc_net_route', self.route_path)
+        except OSError:
+            return self._get_route_command(probe)
+        with self._lock:
+            if data != self._key:
+                self._gateway = parse_proc_route(data.decode('ascii', 'ignore')) or "Unknown"
+                self._key = data
+            return self._gateway
+    
+    def _get_windows(self, probe):
+        now = time.monotonic()
+        with self._lock:
+            if self._key == 'windows' and now < self._expires:
+                return self._gateway
+        gateway = "Unknown"
+        try:
+            output = probe.run('ipconfig', ['ipconfig'])
+            gateway_match = re.search(r'Default Gateway.*:\s*([\d\.]+)', output)
+            if gateway_match:
+                gateway = gateway_match.group(1)
+        except Exception:
+            pass
+        with self._lock:
+            self._key, self._gateway, self._expires = 'windows', gateway, now + self.ttl
+        return gateway
+    
+    def _get_route_command(self, probe):
+        # Fallback for systems without procfs
+        try:
+            output = probe.run('route', ['route', '-n'])
+            gateway_match = re.search(r'0\.0\.0\.0\s+([\d\.]+)', output)
+            if gateway_match:
+                return gateway_match.group(1)
+        except Exception:
+            pass
+        return "Unknown"
+
+gateway_cache = GatewayCache()
+
+# Scan backend: "auto" (nl80211 on Linux when available), "nl80211" or "command" (nmcli/netsh)
+SCAN_BACKEND = os.environ.get('SCAN_BACKEND', 'auto').lower()
+# Replay nl80211 responses from this directory instead of opening a netlink socket
+NL80211_FIXTURES = os.environ.get('NL80211_FIXTURES')
+# Save live nl80211 responses here so they can be replayed later
+NL80211_RECORD_DIR = os.environ.get('NL80211_RECORD_DIR')
+NL80211_TRIGGER_SCAN = os.environ.get('NL80211_TRIGGER_SCAN', '0').lower() in ('1', 'true', 'yes')
+
+class ScanBackend:
+    """Source of current-network and nearby-network data"""
+    
+    name = "base"
+    
+    def current_network(self):
+        """Return the connected network as a dict (ssid, signal, auth, ...)"""
+        raise NotImplementedError
+    
+    def nearby_networks(self):
+        """Return a list of network dicts, or None if scanning is unavailable"""
+        raise NotImplementedError
+    
+    async def nearby_networks_async(self):
+        """Coroutine version of nearby_networks(); by default runs it on the loop's executor"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.nearby_networks)
+
+class NL80211ScanBackend(ScanBackend):
+    """Reads link and scan results over nl80211 netlink, no subprocess"""
+    
+    name = "nl80211"
+    
+    def __init__(self, analyzer, client=None):
+        self.analyzer = analyzer
+        if client is None:
+            transport = (nl80211.RecordedTransport(NL80211_FIXTURES) if NL80211_FIXTURES
+                         else nl80211.SocketTransport(record_dir=NL80211_RECORD_DIR))
+            client = nl80211.NL80211Client(transport, trigger_scan=NL80211_TRIGGER_SCAN)
+        self.client = client
+    
+    def current_network(self):
+        for network in self.nearby_networks():
+            if network["active"]:
+                return {
+                    "ssid": network["name"],
+                    "signal": network["signal"],
+                    "auth": network["auth"],
+                    "security": network["security"],
+                    "bssid": network["bssid"],
+                    "channel": network["channel"],
+                    "frequency": network["frequency"],
+                    "gateway": self.analyzer.get_gateway_ip(),
+                    "estimated_distance": self.analyzer.estimate_wifi_distance(network["signal"])
+                }
+        raise nl80211.NetlinkError("no associated BSS")
+    
+    def nearby_networks(self):
+        return self.client.scan_all()
+
+class CommandScanBackend(ScanBackend):
+    """The original nmcli/netsh subprocess probes"""
+    
+    name = "command"
+    
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+    
+    def current_network(self):
+        if self.analyzer.is_windows():
+            return self.analyzer.get_windows_wifi_info()
+        return self.analyzer.get_linux_wifi_info()
+    
+    def nearby_networks(self):
+        # Linux current-network info uses the same scan, so share the in-flight call
+        output = single_flight.do("nearby", self.analyzer.get_nearby_output)
+        if not output or output.strip() == "":
+            return None
+        return parse_nearby_networks(output, self.analyzer.is_windows())
+    
+    async def nearby_networks_async(self):
+        output = await async_single_flight.do("nearby", self.analyzer.get_nearby_output_async)
+        if not output or output.strip() == "":
+            return None
+        return parse_nearby_networks(output, self.analyzer.is_windows())
+
+def build_scan_backends(analyzer, backend=None):
+    """Return the backends to try in order; the command backend is always the fallback"""
+    backend = backend or SCAN_BACKEND
+    backends = []
+    auto_nl80211 = backend == 'auto' and analyzer.probe.live and not analyzer.is_windows() and nl80211_available()
+    if backend == 'nl80211' or auto_nl80211:
+        backends.append(NL80211ScanBackend(analyzer))
+    backends.append(CommandScanBackend(analyzer))
+    return backends
+
+_nl80211_available = None
+
+def nl80211_available():
+    """Check once per process whether the kernel exposes the nl80211 family"""
+    global _nl80211_available
+    if _nl80211_available is None:
+        try:
+            NL80211ScanBackend(None).client.family_id()
+            _nl80211_available = True
+        except Exception:
+            # No AF_NETLINK (non-Linux) or no wireless driver loaded
+            _nl80211_available = False
+    return _nl80211_available
+
+# Points added to a network's threat score per finding
+THREAT_POINTS = {"unencrypted": 40, "unknown_encryption": 20, "attack_pattern": 30, "open_guest": 15}
+
+# (minimum score, level, color), highest first
+THREAT_LEVELS = (
+    (60, "UNSAFE ⚠️", "red"),
+    (40, "RISKY ⚡", "orange"),
+    (20, "CAUTION 🛡️", "yellow"),
+    (0, "SAFE ✓", "green"),
+)
+
+def threat_level_for(score):
+    """Return (threat_level, color) for a threat score"""
+    for minimum, level, color in THREAT_LEVELS:
+        if score >= minimum:
+            return level, color
+    return THREAT_LEVELS[-1][1:]
+
 class WiFiSecurityAnalyzer:
-    def __init__(self):
+    def __init__(self, backend=None, probe=None):
         self.current_network = None
         self.threat_level = "Unknown"
         self.recommendations = []
+        self.probe = probe or probe_backend
+        self.backends = build_scan_backends(self, backend)
         
     def get_current_network_info(self):
         """Get current WiFi network information"""
         try:
-            if self.is_windows():
-                return self.get_windows_wifi_info()
-            else:
-                return self.get_linux_wifi_info()
+            for backend in self.backends[:-1]:
+                try:
+                    return backend.current_network()
+                except Exception:
+                    # Fall through to the next backend (finally nmcli/netsh)
+                    continue
+            return self.backends[-1].current_network()
         except Exception as e:
             return {"error": str(e), "ssid": "Unknown"}
     
+    def get_nearby_networks(self):
+        """Get parsed nearby networks, None if no backend could scan"""
+        for backend in self.backends:
+            try:
+                networks = backend.nearby_networks()
+            except Exception:
+                continue
+            if networks:
+                return networks
+        return None
+    
+    async def get_nearby_networks_async(self):
+        """Coroutine version of get_nearby_networks() for the ASGI handlers"""
+        for backend in self.backends:
+            try:
+                networks = await backend.nearby_networks_async()
+            except Exception:
+                continue
+            if networks:
+                return networks
+        return None
+    
     def is_windows(self):
-        """Check if running on Windows"""
-        return platform.system() == "Windows"
+        """Check if running on Windows (or replaying Windows recordings)"""
+        return self.probe.platform == "Windows"
     
     def get_windows_wifi_info(self):
         """Get WiFi info on Windows"""
         try:
             # Get current WiFi SSID and signal strength
-            result = subprocess.run(
-                ['netsh', 'wlan', 'show', 'interfaces'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            output = result.stdout
+            output = self.probe.run('netsh_interfaces', ['netsh', 'wlan', 'show', 'interfaces'])
             wifi_info = {"ssid": "Unknown", "signal": 0, "auth": "Unknown"}
             
             # Parse SSID
@@ -87,58 +1368,59 @@ class WiFiSecurityAnalyzer:
     def get_linux_wifi_info(self):
         """Get WiFi info on Linux"""
         try:
-            try:
-                result = subprocess.run(
-                    ['nmcli', 'device', 'wifi', 'show'],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                output = result.stdout
-            except (FileNotFoundError, OSError):
+            # Same terse nmcli scan as the nearby list; the active row is our network
+            output = single_flight.do("nearby", self.get_nearby_output)
+            if not output:
                 # nmcli not available, return default
                 return {"ssid": "Demo Network", "signal": 75, "auth": "WPA2", "security": "WPA2"}
             
             wifi_info = {"ssid": "Unknown", "signal": 0, "auth": "Unknown"}
             
-            ssid_match = re.search(r'SSID:\s*(.+)', output)
-            if ssid_match:
-                wifi_info["ssid"] = ssid_match.group(1).strip()
+            for network in parse_nmcli_terse(output):
+                if network["active"]:
+                    wifi_info.update({
+                        "ssid": network["name"],
+                        "signal": network["signal"],
+                        "auth": network["security"],
+                        "security": network["security"],
+                        "bssid": network["bssid"],
+                        "channel": network["channel"],
+                        "frequency": network["frequency"],
+                        "rate": network["rate"]
+                    })
+                    break
             
-            signal_match = re.search(r'SIGNAL:\s*(\d+)', output)
-            if signal_match:
-                wifi_info["signal"] = int(signal_match.group(1))
+            wifi_info["gateway"] = self.get_gateway_ip()
+            wifi_info["estimated_distance"] = self.estimate_wifi_distance(wifi_info["signal"])
             
             return wifi_info
         except Exception as e:
             return {"error": str(e), "ssid": "Unknown"}
     
-    def get_gateway_ip(self):
-        """Get the gateway/router IP address"""
+    def get_nearby_output(self):
+        """Get raw nearby-network scan output ("" if the scan fails)"""
         try:
             if self.is_windows():
-                result = subprocess.run(
-                    ['ipconfig'],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                gateway_match = re.search(r'Default Gateway.*:\s*([\d\.]+)', result.stdout)
-                if gateway_match:
-                    return gateway_match.group(1)
-            else:
-                result = subprocess.run(
-                    ['route', '-n'],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                gateway_match = re.search(r'0\.0\.0\.0\s+([\d\.]+)', result.stdout)
-                if gateway_match:
-                    return gateway_match.group(1)
-        except:
-            pass
-        return "Unknown"
+                return self.probe.run('netsh_networks', ['netsh', 'wlan', 'show', 'networks', 'mode=Bssid'])
+            return self.probe.run('nmcli_wifi_list',
+                                  ['nmcli', '--terse', '--fields', NMCLI_FIELDS, 'device', 'wifi', 'list'])
+        except Exception:
+            # Command missing or failed, callers fall back to demo data
+            return ""
+    
+    async def get_nearby_output_async(self):
+        """Coroutine version of get_nearby_output()"""
+        try:
+            if self.is_windows():
+                return await self.probe.run_async('netsh_networks', ['netsh', 'wlan', 'show', 'networks', 'mode=Bssid'])
+            return await self.probe.run_async('nmcli_wifi_list',
+                                              ['nmcli', '--terse', '--fields', NMCLI_FIELDS, 'device', 'wifi', 'list'])
+        except Exception:
+            return ""
+    
+    def get_gateway_ip(self):
+        """Get the gateway/router IP address"""
+        return gateway_cache.get(self.probe, self.is_windows())
     
     def estimate_wifi_distance(self, signal_strength):
         """Estimate distance based on WiFi signal strength"""
@@ -156,187 +1438,1308 @@ class WiFiSecurityAnalyzer:
     
     def check_domain_safety(self, domain):
         """Check if domain is in malicious list"""
-        domain_lower = domain.lower()
+        verdict = self.check_domain_blocklist(domain)
+        if verdict is not None:
+            return verdict
         
-        # Check against known malicious domains
-        for malicious in MALICIOUS_DOMAINS:
-            if malicious in domain_lower:
-                return {
-                    "safe": False, 
-                    "reason": "Known malicious domain",
-                    "domain": domain,
-                    "threat_type": "Known Malicious"
-                }
+        # Try to validate domain (cached, including failed lookups)
+        return self.resolution_verdict(domain, dns_cache.resolve(domain))
+    
+    async def check_domain_safety_async(self, domain):
+        """Coroutine version of check_domain_safety(); awaits the DNS lookup"""
+        verdict = self.check_domain_blocklist(domain)
+        if verdict is not None:
+            return verdict
+        return self.resolution_verdict(domain, await dns_cache.resolve_async(domain))
+    
+    def check_domain_blocklist(self, domain):
+        """Check domain against blocklist, keywords and look-alikes, None if nothing matched"""
+        index = threat_index
         
-        # Check for threat keywords
-        for keyword in THREAT_KEYWORDS:
-            if keyword in domain_lower:
-                return {
-                    "safe": False, 
-                    "reason": f"Contains threat keyword: {keyword}",
-                    "domain": domain,
-                    "threat_type": "Threat Keyword Detected"
-                }
+        # Check against known malicious domains (the domain itself or a parent)
+        if index.domains.match(domain) is not None:
+            return {
+                "safe": False, 
+                "reason": "Known malicious domain",
+                "domain": domain,
+                "threat_type": "Known Malicious"
+            }
+        
+        # Check for threat keywords (one automaton scan covers all of them)
+        match = index.keywords.best_match(domain.lower())
+        if match is not None:
+            return {
+                "safe": False, 
+                "reason": f"Contains threat keyword: {match[1]}",
+                "domain": domain,
+                "threat_type": "Threat Keyword Detected"
+            }
+        
+        # Typosquats and homoglyph copies of well-known domains
+        lookalike = domain_lookalikes.match(domain)
+        if lookalike is not None:
+            return {
+                "safe": False,
+                "reason": f"Looks like {lookalike['lookalike_of']}",
+                "domain": domain,
+                "threat_type": "Look-alike Domain",
+                "lookalike_of": lookalike["lookalike_of"]
+            }
+        
+        return None
+    
+    def resolution_verdict(self, domain, address):
+        """Build the verdict for a domain that passed the blocklist checks"""
+        if address is not None:
+            return {
+                "safe": True, 
+                "reason": "Domain resolves successfully",
+                "domain": domain,
+                "threat_type": "None"
+            }
+        else:
+            return {
+                "safe": False, 
+                "reason": "Domain cannot be resolved",
+                "domain": domain,
+                "threat_type": "Resolution Failed"
+            }
+    
+    def check_domains_batch(self, domains):
+        """Check many domains, resolving the survivors concurrently; results keep input order"""
+        results = [None] * len(domains)
+        pending = {}
+        
+        # One pass of blocklist/keyword checks; group survivors by name
+        for index, domain in enumerate(domains):
+            verdict = self.check_domain_blocklist(domain)
+            if verdict is not None:
+                results[index] = verdict
+            else:
+                pending.setdefault(domain.lower().rstrip('.'), []).append(index)
+        
+        if pending:
+            # The resolver backend runs the lookups concurrently (thread pool or asyncio)
+            names = list(pending)
+            for name, address in zip(names, dns_cache.resolve_many(names)):
+                for index in pending[name]:
+                    results[index] = self.resolution_verdict(domains[index], address)
+        
+        return results
+    
+    def check_encryption(self, auth_type):
+        """Check if WiFi uses proper encryption"""
+        auth_lower = auth_type.lower()
+        
+        secure_protocols = ['wpa3', 'wpa2', 'wpa']
+        insecure_protocols = ['wep', 'open']
+        
+        for secure in secure_protocols:
+            if secure in auth_lower:
+                return True, f"Uses {auth_type} encryption (Good)"
+        
+        for insecure in insecure_protocols:
+            if insecure in auth_lower:
+                return False, f"Uses {auth_type} (Insecure)"
+        
+        return None, "Unknown encryption method"
+    
+    def check_known_attacks(self, ssid):
+        """Check for signs of known WiFi attacks"""
+        attacks = []
+        ssid_lower = ssid.lower()
+        
+        # Check for SSID cloning/spoofing patterns
+        if "_ext" in ssid_lower or "_guest" in ssid_lower:
+            attacks.append("Possible SSID cloning detected")
+        
+        # Check for common attack SSIDs
+        if "free" in ssid_lower or "public" in ssid_lower or "wifi" in ssid_lower:
+            attacks.append("Open network - possible Evil Twin attack")
+        
+        # Check SSID name patterns
+        if len(ssid) < 3:
+            attacks.append("Suspiciously short SSID name")
+        
+        return attacks
+    
+    def analyze_network(self, network_info=None):
+        """Perform complete network security analysis"""
+        analysis = {}
+        
+        # Get network info (callers may pass a pre-fetched snapshot)
+        if network_info is None:
+            network_info = self.get_current_network_info()
+        analysis["network_info"] = network_info
+        
+        if "error" in network_info:
+            return {
+                "status": "error",
+                "message": network_info["error"],
+                "threat_level": "Unable to analyze"
+            }
+        
+        ssid = network_info.get("ssid", "Unknown")
+        auth = network_info.get("auth", "Unknown")
+        
+        # Check encryption
+        is_encrypted, encryption_status = self.check_encryption(auth)
+        analysis["encryption"] = {
+            "is_encrypted": is_encrypted,
+            "status": encryption_status
+        }
+        
+        # Check for attacks (SSID patterns, then same-SSID conflicts in the last nearby scan)
+        attacks = self.check_known_attacks(ssid) + evil_twin_detector.attacks_for(ssid)
+        for _, protected in ssid_lookalikes.nearest(ssid)[:1]:
+            attacks.append(f"SSID imitates protected network '{protected}'")
+        analysis["detected_attacks"] = attacks
+        
+        # Determine threat level
+        threat_score = 0
+        threats = []
+        
+        if is_encrypted is False:
+            threat_score += THREAT_POINTS["unencrypted"]
+            threats.append("Unencrypted network - High vulnerability")
+        elif is_encrypted is None:
+            threat_score += THREAT_POINTS["unknown_encryption"]
+            threats.append("Unknown encryption method")
+        
+        if attacks:
+            threat_score += THREAT_POINTS["attack_pattern"]
+            threats.extend(attacks)
+        
+        if "open" in ssid.lower() or "guest" in ssid.lower():
+            threat_score += THREAT_POINTS["open_guest"]
+            threats.append("Open/Guest network detected")
+        
+        # Determine threat level
+        threat_level, color = threat_level_for(threat_score)
+        
+        analysis["threat_level"] = threat_level
+        analysis["threat_score"] = threat_score
+        analysis["threats"] = threats
+        analysis["color"] = color
+        
+        # Generate recommendations
+        recommendations = self.generate_recommendations(analysis)
+        analysis["recommendations"] = recommendations
+        
+        return analysis
+    
+    def generate_recommendations(self, analysis):
+        """Generate security recommendations"""
+        recommendations = []
+        
+        encryption = analysis.get("encryption", {})
+        if not encryption.get("is_encrypted"):
+            recommendations.append("Use a WPA3 or WPA2 encrypted network instead")
+        
+        threats = analysis.get("threats", [])
+        if threats:
+            recommendations.append("Consider connecting to a different, more secure network")
+        
+        if "open" in analysis["network_info"].get("ssid", "").lower():
+            recommendations.append("Never enter sensitive information on open networks")
+            recommendations.append("Use a VPN when connected to public networks")
+        
+        if not recommendations:
+            recommendations.append("Network appears secure. Continue standard security practices")
+            recommendations.append("Avoid sharing sensitive data on any public network")
+        
+        return recommendations
+
+def network_scoring_fields(network):
+    """The (ssid, auth) pair a nearby-network entry is scored on"""
+    return network.get("name") or "", network.get("auth") or network.get("security") or ""
+
+def score_networks_loop(networks, analyzer=None):
+    """Score each network with check_encryption/check_known_attacks, as analyze_network does
+    
+    Returns (scores, levels, colors) lists in input order.
+    """
+    analyzer = analyzer or WiFiSecurityAnalyzer()
+    scores, levels, colors = [], [], []
+    for network in networks:
+        ssid, auth = network_scoring_fields(network)
+        is_encrypted, _ = analyzer.check_encryption(auth)
+        score = 0
+        if is_encrypted is False:
+            score += THREAT_POINTS["unencrypted"]
+        elif is_encrypted is None:
+            score += THREAT_POINTS["unknown_encryption"]
+        if analyzer.check_known_attacks(ssid):
+            score += THREAT_POINTS["attack_pattern"]
+        if "open" in ssid.lower() or "guest" in ssid.lower():
+            score += THREAT_POINTS["open_guest"]
+        level, color = threat_level_for(score)
+        scores.append(score)
+        levels.append(level)
+        colors.append(color)
+    return scores, levels, colors
+
+def score_networks(networks, analyzer=None):
+    """Score a whole nearby scan in one vectorized NumPy pass; same results as score_networks_loop"""
+    analyzer = analyzer or WiFiSecurityAnalyzer()
+    if np is None:
+        return score_networks_loop(networks, analyzer)
+    if not networks:
+        return [], [], []
+    
+    fields = [network_scoring_fields(n) for n in networks]
+    ssid_lower = np.array([ssid.lower() for ssid, _ in fields], dtype=np.str_)
+    ssid_length = np.fromiter((len(ssid) for ssid, _ in fields), dtype=np.int64, count=len(fields))
+    
+    # A scan has a handful of distinct auth strings: run check_encryption once per string
+    # and turn the results into per-network penalty points
+    encryption_points = {}
+    for _, auth in fields:
+        if auth not in encryption_points:
+            is_encrypted, _ = analyzer.check_encryption(auth)
+            encryption_points[auth] = (THREAT_POINTS["unencrypted"] if is_encrypted is False else
+                                       THREAT_POINTS["unknown_encryption"] if is_encrypted is None else 0)
+    scores = np.array([encryption_points[auth] for _, auth in fields], dtype=np.int64)
+    
+    def contains(*needles):
+        found = np.zeros(len(fields), dtype=bool)
+        for needle in needles:
+            found |= np.char.find(ssid_lower, needle) >= 0
+        return found
+    
+    # check_known_attacks: cloning suffixes, bait names, very short SSIDs
+    attack = contains('_ext', '_guest', 'free', 'public', 'wifi') | (ssid_length < 3)
+    open_guest = contains('open', 'guest')
+    scores += THREAT_POINTS["attack_pattern"] * attack + THREAT_POINTS["open_guest"] * open_guest
+    
+    # Index of the first (highest) level whose minimum the score reaches
+    minimums = np.array([minimum for minimum, _, _ in THREAT_LEVELS])
+    level_index = np.argmax(scores[:, None] >= minimums[None, :], axis=1).tolist()
+    levels = [THREAT_LEVELS[i][1] for i in level_index]
+    colors = [THREAT_LEVELS[i][2] for i in level_index]
+    return scores.tolist(), levels, colors
+
+def with_threat_scores(networks):
+    """Copies of the network entries with threat_score, threat_level and color added"""
+    scores, levels, colors = score_networks(networks)
+    return [dict(network, threat_score=score, threat_level=level, color=color)
+            for network, score, level, color in zip(networks, scores, levels, colors)]
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+    
+    def do(self, key, fn):
+        """Run fn() unless a call for key is already running, then share its result"""
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._inflight[key] = call
+                self.stats["executions"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        
+        try:
+            call["result"] = fn()
+        except Exception as e:
+            call["error"] = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call["done"].set()
+        return call["result"]
+    
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["inflight"] = len(self._inflight)
+        return stats
+
+single_flight = SingleFlight()
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: concurrent awaits of one key share a task on the event loop"""
+    
+    def __init__(self):
+        self._inflight = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+    
+    async def do(self, key, fn):
+        """Await fn() unless a call for key is already running, then share its result"""
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.stats["executions"] += 1
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.stats["coalesced"] += 1
+        # A cancelled (disconnected) caller must not cancel the shared call
+        return await asyncio.shield(task)
+    
+    def _finish(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+    
+    def get_stats(self):
+        return dict(self.stats, inflight=len(self._inflight))
+
+async_single_flight = AsyncSingleFlight()
+
+# Background scan refresh interval in seconds
+SCAN_INTERVAL = float(os.environ.get('SCAN_INTERVAL', 15))
+
+class NetworkScanner:
+    """Background thread that keeps a snapshot of the current network info"""
+    
+    def __init__(self, interval=SCAN_INTERVAL):
+        self.interval = interval
+        self.analyzer = WiFiSecurityAnalyzer()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._snapshot = None
+        self._scanned_at = None
+        self._scan_count = 0
+    
+    def start(self):
+        """Start the scanner thread (once per worker process)"""
+        with self._lock:
+            # Threads do not survive a fork, so restart in each gunicorn worker
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name="network-scanner", daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            self.refresh()
+            time.sleep(self.interval)
+    
+    def refresh(self):
+        """Probe the network now and store the result as the latest snapshot"""
+        try:
+            info = single_flight.do("network_info", self.analyzer.get_current_network_info)
+        except Exception as e:
+            info = {"error": str(e), "ssid": "Unknown"}
+        with self._lock:
+            self._snapshot = info
+            self._scanned_at = time.time()
+            self._scan_count += 1
+        self._ready.set()
+        return info
+    
+    def get_stats(self):
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "scan_count": self._scan_count,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "last_scan": datetime.fromtimestamp(self._scanned_at).isoformat() if self._scanned_at else None
+            }
+    
+    def get_snapshot(self, wait=None):
+        """Return (network_info, scan metadata) from the latest snapshot"""
+        self.start()
+        if not self._ready.is_set():
+            # First call in this worker: wait briefly for the initial probe
+            self._ready.wait(self.interval if wait is None else wait)
+        with self._lock:
+            info = dict(self._snapshot) if self._snapshot is not None else None
+            scanned_at = self._scanned_at
+            scan_count = self._scan_count
+        
+        if info is None:
+            return None, {"scanned_at": None, "age_seconds": None, "stale": True,
+                          "interval": self.interval, "scan_count": scan_count}
+        
+        age = time.time() - scanned_at
+        return info, {
+            "scanned_at": datetime.fromtimestamp(scanned_at).isoformat(),
+            "age_seconds": round(age, 3),
+            "stale": age > 2 * self.interval,
+            "interval": self.interval,
+            "scan_count": scan_count
+        }
+
+network_scanner = NetworkScanner()
+
+# Persistent history of scans, analyses, domain checks and device logs ('' disables it)
+HISTORY_DB = os.environ.get('HISTORY_DB', 'history.db')
+HISTORY_RETENTION_DAYS = float(os.environ.get('HISTORY_RETENTION_DAYS', 30))
+HISTORY_QUEUE_SIZE = int(os.environ.get('HISTORY_QUEUE_SIZE', 10000))
+HISTORY_BATCH_SIZE = int(os.environ.get('HISTORY_BATCH_SIZE', 500))
+HISTORY_FLUSH_INTERVAL = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 1))
+HISTORY_PRUNE_INTERVAL = float(os.environ.get('HISTORY_PRUNE_INTERVAL', 3600))
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, ssid TEXT, bssid TEXT,
+    channel INTEGER, signal INTEGER, security TEXT);
+CREATE INDEX IF NOT EXISTS scans_ts ON scans (ts);
+CREATE INDEX IF NOT EXISTS scans_bssid_ts ON scans (bssid, ts);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, ssid TEXT, threat_level TEXT,
+    threat_score INTEGER, result TEXT);
+CREATE INDEX IF NOT EXISTS analyses_ts ON analyses (ts);
+CREATE INDEX IF NOT EXISTS analyses_ssid_ts ON analyses (ssid, ts);
+CREATE TABLE IF NOT EXISTS domain_checks (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, domain TEXT, safe INTEGER,
+    threat_type TEXT, reason TEXT);
+CREATE INDEX IF NOT EXISTS domain_checks_ts ON domain_checks (ts);
+CREATE INDEX IF NOT EXISTS domain_checks_domain_ts ON domain_checks (domain, ts);
+CREATE TABLE IF NOT EXISTS device_logs (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, device TEXT, remote_addr TEXT);
+CREATE INDEX IF NOT EXISTS device_logs_ts ON device_logs (ts);
+CREATE INDEX IF NOT EXISTS device_logs_device_ts ON device_logs (device, ts);
+"""
+
+# Columns per table (after id), and the one column each can be filtered on
+HISTORY_TABLES = {
+    "scans": (("ts", "ssid", "bssid", "channel", "signal", "security"), "bssid"),
+    "analyses": (("ts", "ssid", "threat_level", "threat_score", "result"), "ssid"),
+    "domain_checks": (("ts", "domain", "safe", "threat_type", "reason"), "domain"),
+    "device_logs": (("ts", "device", "remote_addr"), "device"),
+}
+
+class HistoryStore:
+    """SQLite (WAL) history written in batches by a background thread, off the request path"""
+    
+    def __init__(self, path=HISTORY_DB, retention_days=HISTORY_RETENTION_DAYS, queue_size=HISTORY_QUEUE_SIZE,
+                 batch_size=HISTORY_BATCH_SIZE, flush_interval=HISTORY_FLUSH_INTERVAL,
+                 prune_interval=HISTORY_PRUNE_INTERVAL):
+        self.path = path
+        self.retention = retention_days * 86400
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._last_analysis = None
+        self._failed_pid = None
+        self.last_error = None
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "batches": 0, "pruned": 0, "errors": 0}
+    
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        # WAL lets request threads (and other workers) read while the writer commits
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    def start(self):
+        """Create the schema and start the writer thread (once per worker process)"""
+        if not self.path or self._failed_pid == os.getpid():
+            return False
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return True
+            try:
+                connection = self.connect()
+                connection.executescript(HISTORY_SCHEMA)
+            except sqlite3.Error as e:
+                # e.g. a read-only filesystem on cloud hosting: run without history in this worker
+                self._failed_pid = os.getpid()
+                self.last_error = f"{datetime.now().isoformat()}: {e}"
+                self.stats["errors"] += 1
+                return False
+            self._pid = os.getpid()
+            # A queue inherited through fork may hold the parent's items or locks
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._thread = threading.Thread(target=self._run, args=(connection, self._queue),
+                                            name="history-writer", daemon=True)
+            self._thread.start()
+            return True
+    
+    def record(self, table, rows):
+        """Queue rows (tuples in HISTORY_TABLES column order) for the writer; never blocks"""
+        if not rows or not self.start():
+            return False
+        try:
+            # One queue slot per call, so a large batch check cannot crowd out other writes
+            self._queue.put_nowait((table, rows))
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += len(rows)
+            return False
+        with self._lock:
+            self.stats["queued"] += len(rows)
+        return True
+    
+    def record_scan(self, networks, when=None):
+        when = when or time.time()
+        self.record("scans", [(when, n.get("name"), n.get("bssid"), n.get("channel"), n.get("signal"),
+                               n.get("security")) for n in networks])
+    
+    def record_analysis(self, result, when=None):
+        """Store an analysis if it differs from the last one this worker stored"""
+        comparable = {k: v for k, v in result.items() if k != "scan"}
+        with self._lock:
+            if comparable == self._last_analysis:
+                return
+            self._last_analysis = comparable
+        ssid = (result.get("network_info") or {}).get("ssid")
+        self.record("analyses", [(when or time.time(), ssid, result.get("threat_level"),
+                                  result.get("threat_score"), json.dumps(comparable, default=str))])
+    
+    def record_domain_checks(self, verdicts, when=None):
+        when = when or time.time()
+        self.record("domain_checks", [(when, v.get("domain"), int(bool(v.get("safe"))), v.get("threat_type"),
+                                       v.get("reason")) for v in verdicts])
+    
+    def record_device(self, device, remote_addr=None, when=None):
+        self.record("device_logs", [(when or time.time(), device, remote_addr)])
+    
+    def _run(self, connection, pending):
+        pruned_at = 0.0
+        while True:
+            try:
+                batch = [pending.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            # Drain whatever else is waiting, up to one batch
+            count = sum(len(rows) for _, rows in batch)
+            while batch and count < self.batch_size:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                count += len(item[1])
+            if batch:
+                self.write(connection, batch)
+            if time.monotonic() - pruned_at >= self.prune_interval:
+                pruned_at = time.monotonic()
+                self.prune(connection)
+    
+    def write(self, connection, batch):
+        """Insert queued rows, one executemany per table in a single transaction"""
+        by_table = {}
+        for table, rows in batch:
+            by_table.setdefault(table, []).extend(rows)
+        try:
+            with connection:
+                for table, rows in by_table.items():
+                    columns = HISTORY_TABLES[table][0]
+                    connection.executemany(
+                        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                        rows)
+        except sqlite3.Error as e:
+            with self._lock:
+                self.last_error = f"{datetime.now().isoformat()}: {e}"
+                self.stats["errors"] += 1
+                self.stats["dropped"] += sum(len(rows) for rows in by_table.values())
+            return
+        with self._lock:
+            self.stats["written"] += sum(len(rows) for rows in by_table.values())
+            self.stats["batches"] += 1
+    
+    def prune(self, connection):
+        """Delete rows older than the retention period (a range delete on each ts index)"""
+        if self.retention <= 0:
+            return
+        cutoff = time.time() - self.retention
+        try:
+            with connection:
+                deleted = sum(connection.execute(f"DELETE FROM {table} WHERE ts < ?", (cutoff,)).rowcount
+                              for table in HISTORY_TABLES)
+        except sqlite3.Error as e:
+            with self._lock:
+                self.last_error = f"{datetime.now().isoformat()}: {e}"
+                self.stats["errors"] += 1
+            return
+        with self._lock:
+            self.stats["pruned"] += deleted
+    
+    def query(self, table, key=None, since=None, until=None, limit=100):
+        """Newest-first rows of one table, optionally for one key (bssid, ssid, domain or device)"""
+        if not self.start():
+            return []
+        columns, key_column = HISTORY_TABLES[table]
+        where, params = [], []
+        if key is not None:
+            where.append(f"{key_column} = ?")
+            params.append(key)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+        sql = f"SELECT {', '.join(columns)} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        
+        connection = self.connect()
+        try:
+            rows = connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+        results = []
+        for row in rows:
+            entry = dict(zip(columns, row))
+            entry["ts"] = datetime.fromtimestamp(entry["ts"]).isoformat()
+            if table == "analyses":
+                entry["result"] = json.loads(entry["result"])
+            elif table == "domain_checks":
+                entry["safe"] = bool(entry["safe"])
+            results.append(entry)
+        return results
+    
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, enabled=bool(self.path), path=self.path,
+                        pending=self._queue.qsize() if self._queue is not None else 0,
+                        retention_days=self.retention / 86400,
+                        running=self._thread is not None and self._thread.is_alive(),
+                        last_error=self.last_error)
+
+history_store = HistoryStore()
+
+# How many nearby-network diffs to keep for clients catching up
+NEARBY_HISTORY = int(os.environ.get('NEARBY_HISTORY', 256))
+
+def network_key(network):
+    """Identity of a scan entry: SSID plus BSSID (BSSID is None on some backends)"""
+    return network.get("name"), network.get("bssid")
+
+# Signal change (percent points) of one BSSID between consecutive scans that looks like a takeover
+EVIL_TWIN_RSSI_JUMP = int(os.environ.get('EVIL_TWIN_RSSI_JUMP', 30))
+
+# Flags that mark an SSID as a likely evil twin. Several channels or vendors alone are normal
+# for multi-AP networks, and WPA2/WPA3 side by side is transition mode
+EVIL_TWIN_FLAGS = ("security_downgrade", "rssi_jump")
+
+# Security labels an attacker can offer next to a WPA network to capture clients
+WEAK_SECURITY = ("Open", "WEP")
+
+def normalize_ssid(ssid):
+    """Grouping key for an SSID: case-folded with whitespace collapsed"""
+    return " ".join(ssid.split()).casefold() if ssid else ""
+
+def bssid_oui(bssid):
+    """Vendor prefix of a BSSID, None if unknown or locally administered"""
+    if not bssid or len(bssid) < 8:
+        return None
+    try:
+        first = int(bssid[:2], 16)
+    except ValueError:
+        return None
+    # Multi-SSID APs derive extra BSSIDs with the local bit set; those carry no vendor
+    if first & 0x02:
+        return None
+    return bssid[:8].upper()
+
+class EvilTwinDetector:
+    """Groups each nearby scan by normalized SSID and flags inconsistent groups in one pass"""
+    
+    def __init__(self, rssi_jump=EVIL_TWIN_RSSI_JUMP):
+        self.rssi_jump = rssi_jump
+        self._lock = threading.Lock()
+        self._signals = {}
+        self._findings = {}
+        self.generation = 0
+        self.stats = {"scans": 0, "groups": 0, "flagged": 0}
+    
+    def update(self, networks):
+        """Index a scan and recompute findings; returns the findings keyed by normalized SSID"""
+        groups = {}
+        signals = {}
+        for network in networks:
+            key = normalize_ssid(network.get("name"))
+            # Hidden networks all share a placeholder name, so they cannot be compared
+            if not key or key == "unknown":
+                continue
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {"ssid": network.get("name"), "entries": [],
+                                       "security": set(), "ouis": set(), "channels": set()}
+            bssid = network.get("bssid")
+            group["entries"].append(network)
+            group["security"].add(security_label(f"{network.get('auth') or ''} {network.get('security') or ''}"))
+            oui = bssid_oui(bssid)
+            if oui is not None:
+                group["ouis"].add(oui)
+            if network.get("channel") is not None:
+                group["channels"].add(network["channel"])
+            if bssid:
+                signals[bssid] = network.get("signal") or 0
+        
+        with self._lock:
+            previous = self._signals
+            findings = {}
+            for key, group in groups.items():
+                flags = []
+                reasons = []
+                weak = group["security"].intersection(WEAK_SECURITY)
+                if weak and group["security"].difference(WEAK_SECURITY):
+                    flags.append("security_downgrade")
+                    reasons.append("Same SSID also advertised without WPA: " + ", ".join(sorted(group["security"])))
+                if len(group["ouis"]) > 1:
+                    flags.append("vendor_mismatch")
+                    reasons.append("Same SSID from access points of different vendors: " + ", ".join(sorted(group["ouis"])))
+                if len(group["channels"]) > 1:
+                    flags.append("channel_mismatch")
+                    reasons.append("Same SSID on channels " + ", ".join(map(str, sorted(group["channels"]))))
+                jumps = [n.get("bssid") for n in group["entries"]
+                         if n.get("bssid") in previous
+                         and abs(signals[n["bssid"]] - previous[n["bssid"]]) >= self.rssi_jump]
+                if jumps:
+                    flags.append("rssi_jump")
+                    reasons.append("Signal jumped by " + str(self.rssi_jump) + "+ points since the last scan: " + ", ".join(jumps))
+                if flags:
+                    findings[key] = {
+                        "ssid": group["ssid"],
+                        "suspicious": any(flag in EVIL_TWIN_FLAGS for flag in flags),
+                        "flags": flags,
+                        "reasons": reasons,
+                        "bssids": [{"bssid": n.get("bssid"), "security": n.get("security"),
+                                    "channel": n.get("channel"), "signal": n.get("signal")}
+                                   for n in group["entries"]]
+                    }
+            
+            # Only the latest scan is kept, so memory follows what is currently visible
+            self._signals = signals
+            # Signal readings change every scan; only new or cleared warnings change the analysis
+            if {k: f["reasons"] for k, f in findings.items()} != {k: f["reasons"] for k, f in self._findings.items()}:
+                self.generation += 1
+            self._findings = findings
+            self.stats["scans"] += 1
+            self.stats["groups"] = len(groups)
+            self.stats["flagged"] = len(findings)
+            return findings
+    
+    def findings(self, suspicious_only=False):
+        with self._lock:
+            return [f for f in self._findings.values() if f["suspicious"] or not suspicious_only]
+    
+    def attacks_for(self, ssid):
+        """Evil-twin warnings for the connected SSID, in check_known_attacks() form"""
+        with self._lock:
+            finding = self._findings.get(normalize_ssid(ssid))
+        if finding is None or not finding["suspicious"]:
+            return []
+        return ["Possible Evil Twin: " + reason
+                for flag, reason in zip(finding["flags"], finding["reasons"]) if flag in EVIL_TWIN_FLAGS]
+    
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, generation=self.generation, rssi_jump=self.rssi_jump)
+
+evil_twin_detector = EvilTwinDetector()
+
+# Signal samples kept per BSSID, how many BSSIDs are tracked, and the smoothing factor
+RSSI_HISTORY_SIZE = int(os.environ.get('RSSI_HISTORY_SIZE', 120))
+RSSI_MAX_BSSIDS = int(os.environ.get('RSSI_MAX_BSSIDS', 4096))
+RSSI_SMOOTHING = float(os.environ.get('RSSI_SMOOTHING', 0.3))
+
+class SignalRing:
+    """Fixed-size ring of one BSSID's signal samples (percent) with running sums"""
+    
+    __slots__ = ("ssid", "samples", "times", "next", "count", "total", "total_sq", "smoothed")
+    
+    def __init__(self, size, ssid=None):
+        self.ssid = ssid
+        self.samples = array('B', bytes(size))
+        self.times = array('d', bytes(8 * size))
+        self.next = 0
+        self.count = 0
+        self.total = 0
+        self.total_sq = 0
+        self.smoothed = None
+    
+    def add(self, signal, when, alpha):
+        signal = max(0, min(100, int(signal)))
+        if self.count == len(self.samples):
+            # Overwrite the oldest sample and drop it from the running sums
+            old = self.samples[self.next]
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+        self.samples[self.next] = signal
+        self.times[self.next] = when
+        self.next = (self.next + 1) % len(self.samples)
+        self.total += signal
+        self.total_sq += signal * signal
+        # Exponentially weighted mean damps single-scan fluctuations
+        self.smoothed = signal if self.smoothed is None else self.smoothed + alpha * (signal - self.smoothed)
+    
+    def ordered(self, values):
+        """Contents of a ring-aligned array, oldest first"""
+        if self.count < len(values):
+            return values[:self.count]
+        return values[self.next:] + values[:self.next]
+    
+    def summary(self):
+        mean = self.total / self.count
+        variance = max(0.0, self.total_sq / self.count - mean * mean)
+        samples = self.ordered(self.samples)
+        times = self.ordered(self.times)
+        return {
+            "ssid": self.ssid,
+            "samples": self.count,
+            "last": samples[-1],
+            "mean": round(mean, 2),
+            "variance": round(variance, 2),
+            "stddev": round(math.sqrt(variance), 2),
+            "min": min(samples),
+            "max": max(samples),
+            "smoothed": round(self.smoothed, 1),
+            "first_seen": datetime.fromtimestamp(times[0]).isoformat(),
+            "last_seen": datetime.fromtimestamp(times[-1]).isoformat()
+        }
+
+class SignalHistory:
+    """Per-BSSID signal ring buffers, bounded in samples per BSSID and in BSSIDs tracked"""
+    
+    def __init__(self, size=RSSI_HISTORY_SIZE, max_bssids=RSSI_MAX_BSSIDS, alpha=RSSI_SMOOTHING):
+        self.size = size
+        self.max_bssids = max_bssids
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._rings = OrderedDict()
+        self.stats = {"scans": 0, "samples": 0, "evictions": 0}
+    
+    def record(self, networks, when=None):
+        """Append one scan's signal readings"""
+        when = when or time.time()
+        with self._lock:
+            for network in networks:
+                bssid = network.get("bssid")
+                if not bssid:
+                    continue
+                ring = self._rings.get(bssid)
+                if ring is None:
+                    ring = self._rings[bssid] = SignalRing(self.size)
+                    if len(self._rings) > self.max_bssids:
+                        # Forget the BSSID not seen for the longest time
+                        self._rings.popitem(last=False)
+                        self.stats["evictions"] += 1
+                else:
+                    self._rings.move_to_end(bssid)
+                ring.ssid = network.get("name")
+                ring.add(network.get("signal") or 0, when, self.alpha)
+                self.stats["samples"] += 1
+            self.stats["scans"] += 1
+    
+    def summary(self, bssid, with_samples=False):
+        """Rolling statistics for one BSSID, None if it was never seen"""
+        with self._lock:
+            ring = self._rings.get(bssid.lower())
+            if ring is None:
+                return None
+            summary = ring.summary()
+            if with_samples:
+                summary["history"] = list(zip(
+                    (datetime.fromtimestamp(t).isoformat() for t in ring.ordered(ring.times)),
+                    ring.ordered(ring.samples)))
+        summary["bssid"] = bssid.lower()
+        return summary
+    
+    def summaries(self):
+        """Rolling statistics for every tracked BSSID, most recently seen first"""
+        with self._lock:
+            return [dict(ring.summary(), bssid=bssid) for bssid, ring in reversed(self._rings.items())]
+    
+    def memory_bytes(self):
+        # One byte per sample plus an 8-byte timestamp, per tracked BSSID
+        with self._lock:
+            return len(self._rings) * self.size * 9
+    
+    def get_stats(self):
+        memory = self.memory_bytes()
+        with self._lock:
+            return dict(self.stats, bssids=len(self._rings), max_bssids=self.max_bssids,
+                        samples_per_bssid=self.size, memory_bytes=memory)
+
+signal_history = SignalHistory()
+
+class NearbyNetworkTracker:
+    """Keeps the last nearby scan and a numbered history of keyed diffs"""
+    
+    def __init__(self, history=NEARBY_HISTORY):
+        self._lock = threading.Lock()
+        self._networks = {}
+        self._history = deque(maxlen=history)
+        self._scanned_at = 0.0
+        self.seq = 0
+        self.scans = 0
+    
+    def update(self, networks):
+        """Diff one executed scan against the previous one; returns the new sequence number
         
-        # Try to validate domain
-        try:
-            socket.gethostbyname(domain)
-            return {
-                "safe": True, 
-                "reason": "Domain resolves successfully",
-                "domain": domain,
-                "threat_type": "None"
-            }
-        except:
+        Every call counts as a new measurement, so refresh() calls it only from the
+        single-flight leader: coalesced callers share the scan without recording it again.
+        """
+        current = {network_key(n): n for n in networks}
+        with self._lock:
+            self._scanned_at = time.monotonic()
+            self.scans += 1
+            previous = self._networks
+            added = [n for key, n in current.items() if key not in previous]
+            removed = [list(key) for key in previous if key not in current]
+            changed = [n for key, n in current.items() if key in previous and previous[key] != n]
+            if added or removed or changed:
+                self.seq += 1
+                self._history.append((self.seq, added, removed, changed))
+                self._networks = current
+            seq = self.seq
+        # Sampled, compared for signal jumps and stored once per scan, even when nothing changed
+        signal_history.record(networks)
+        evil_twin_detector.update(networks)
+        history_store.record_scan(networks)
+        return seq
+    
+    def scan(self, analyzer):
+        """Run one nearby scan into the tracker; False if no backend could scan"""
+        networks = analyzer.get_nearby_networks()
+        if networks is None:
+            return False
+        self.update(networks)
+        return True
+    
+    async def scan_async(self, analyzer):
+        """Coroutine version of scan() for the ASGI handlers"""
+        networks = await analyzer.get_nearby_networks_async()
+        if networks is None:
+            return False
+        self.update(networks)
+        return True
+    
+    def refresh(self, analyzer, max_age):
+        """Scan again if the last scan is older than max_age seconds"""
+        if time.monotonic() - self._scanned_at < max_age:
+            return True
+        return single_flight.do("nearby_networks", lambda: self.scan(analyzer))
+    
+    async def refresh_async(self, analyzer, max_age):
+        """Coroutine version of refresh() for the ASGI handlers"""
+        if time.monotonic() - self._scanned_at < max_age:
+            return True
+        return await async_single_flight.do("nearby_networks", lambda: self.scan_async(analyzer))
+    
+    def snapshot(self):
+        with self._lock:
+            return self.seq, list(self._networks.values())
+    
+    def changes_since(self, since):
+        """Return deltas after sequence number since (a full reset if it is too old)"""
+        with self._lock:
+            seq = self.seq
+            oldest = self._history[0][0] if self._history else seq + 1
+            if since is None or since > seq or since < oldest - 1:
+                # Unknown or expired position: client must replace its list
+                return {"seq": seq, "reset": True, "networks": list(self._networks.values())}
+            
+            # Whether each key touched after `since` existed at `since` (known from its first event)
+            existed = {}
+            for entry_seq, entry_added, entry_removed, entry_changed in self._history:
+                if entry_seq <= since:
+                    continue
+                for network in entry_added:
+                    existed.setdefault(network_key(network), False)
+                for network in entry_changed:
+                    existed.setdefault(network_key(network), True)
+                for key in map(tuple, entry_removed):
+                    existed.setdefault(key, True)
+            
+            # Compare the state at `since` with the current one, whatever happened in between
+            added, removed, changed = [], [], []
+            for key, was_present in existed.items():
+                network = self._networks.get(key)
+                if network is None:
+                    if was_present:
+                        removed.append(list(key))
+                elif was_present:
+                    changed.append(network)
+                else:
+                    added.append(network)
             return {
-                "safe": False, 
-                "reason": "Domain cannot be resolved",
-                "domain": domain,
-                "threat_type": "Resolution Failed"
+                "seq": seq,
+                "reset": False,
+                "added": added,
+                "removed": removed,
+                "changed": changed
             }
     
-    def check_encryption(self, auth_type):
-        """Check if WiFi uses proper encryption"""
-        auth_lower = auth_type.lower()
-        
-        secure_protocols = ['wpa3', 'wpa2', 'wpa']
-        insecure_protocols = ['wep', 'open']
-        
-        for secure in secure_protocols:
-            if secure in auth_lower:
-                return True, f"Uses {auth_type} encryption (Good)"
-        
-        for insecure in insecure_protocols:
-            if insecure in auth_lower:
-                return False, f"Uses {auth_type} (Insecure)"
-        
-        return None, "Unknown encryption method"
+    def get_stats(self):
+        with self._lock:
+            return {"seq": self.seq, "scans": self.scans, "networks": len(self._networks), "history": len(self._history)}
+
+nearby_tracker = NearbyNetworkTracker()
+
+class ChannelPlan:
+    """The 20 MHz channels of one band and how much each pair of them overlaps"""
     
-    def check_known_attacks(self, ssid):
-        """Check for signs of known WiFi attacks"""
-        attacks = []
-        ssid_lower = ssid.lower()
-        
-        # Check for SSID cloning/spoofing patterns
-        if "_ext" in ssid_lower or "_guest" in ssid_lower:
-            attacks.append("Possible SSID cloning detected")
-        
-        # Check for common attack SSIDs
-        if "free" in ssid_lower or "public" in ssid_lower or "wifi" in ssid_lower:
-            attacks.append("Open network - possible Evil Twin attack")
-        
-        # Check SSID name patterns
-        if len(ssid) < 3:
-            attacks.append("Suspiciously short SSID name")
-        
-        return attacks
+    def __init__(self, band, channels, recommend, base_mhz, width_mhz):
+        self.band = band
+        self.channels = channels
+        self.recommend = recommend
+        self.base_mhz = base_mhz
+        self.width_mhz = width_mhz
+        self.index = {channel: i for i, channel in enumerate(channels)}
+        centers = [base_mhz + 5 * channel for channel in channels]
+        # Fraction of spectrum shared by two channels whose centers are df MHz apart
+        overlap = [[max(0.0, 1 - abs(a - b) / width_mhz) for b in centers] for a in centers]
+        self.overlap = np.array(overlap) if np is not None else overlap
     
-    def analyze_network(self):
-        """Perform complete network security analysis"""
-        analysis = {}
-        
-        # Get network info
-        network_info = self.get_current_network_info()
-        analysis["network_info"] = network_info
+    def congestion(self, networks):
+        """Per-channel (BSSID count, overlap-weighted congestion) for this band's networks"""
+        positions = [self.index[n["channel"]] for n in networks]
+        # Strong neighbours interfere more than faint ones
+        weights = [(n.get("signal") or 0) / 100 for n in networks]
+        size = len(self.channels)
+        if np is not None:
+            counts = np.bincount(positions, minlength=size)
+            load = np.bincount(positions, weights, minlength=size) if positions else np.zeros(size)
+            return counts.tolist(), (self.overlap @ load).tolist()
+        counts = [0] * size
+        load = [0.0] * size
+        for position, weight in zip(positions, weights):
+            counts[position] += 1
+            load[position] += weight
+        return counts, [sum(o * l for o, l in zip(row, load)) for row in self.overlap]
+
+# Scans report only the primary 20 MHz channel, so wider (bonded) channels are not modelled.
+# 2.4 GHz channels are 5 MHz apart but 22 MHz wide; 5 and 6 GHz channels do not overlap.
+CHANNELS_5GHZ = list(range(36, 65, 4)) + list(range(100, 145, 4)) + list(range(149, 166, 4))
+CHANNEL_PLANS = {
+    "2.4": ChannelPlan("2.4", list(range(1, 15)), [1, 6, 11], 2407, 22),
+    "5": ChannelPlan("5", CHANNELS_5GHZ, CHANNELS_5GHZ, 5000, 20),
+    # Preferred scanning channels (every fourth) are the ones clients look for first
+    "6": ChannelPlan("6", list(range(1, 234, 4)), list(range(5, 234, 16)), 5950, 20),
+}
+
+def network_band(network):
+    """'2.4', '5' or '6' from a scan entry's frequency, band label or channel"""
+    frequency = network.get("frequency")
+    if frequency:
+        return "2.4" if frequency < 3000 else "5" if frequency < 5925 else "6"
+    band = (network.get("band") or "").split(' ', 1)[0]
+    if band in CHANNEL_PLANS:
+        return band
+    channel = network.get("channel")
+    if channel:
+        return "2.4" if channel <= 14 else "5"
+    return None
+
+class ChannelCongestion:
+    """Channel congestion per band for the tracker's latest scan, recomputed only when it changes"""
+    
+    def __init__(self, plans=CHANNEL_PLANS):
+        self.plans = plans
+        self._lock = threading.Lock()
+        self._seq = None
+        self._result = None
+        self.stats = {"requests": 0, "computations": 0}
+    
+    def analyze(self, seq, networks):
+        with self._lock:
+            self.stats["requests"] += 1
+            if seq == self._seq:
+                return self._result
+        result = self.compute(networks)
+        with self._lock:
+            self.stats["computations"] += 1
+            self._seq, self._result = seq, result
+        return result
+    
+    def compute(self, networks):
+        by_band = {band: [] for band in self.plans}
+        active = None
+        for network in networks:
+            band = network_band(network)
+            if band is None or network.get("channel") not in self.plans[band].index:
+                continue
+            by_band[band].append(network)
+            if network.get("active"):
+                active = (band, network["channel"])
         
-        if "error" in network_info:
-            return {
-                "status": "error",
-                "message": network_info["error"],
-                "threat_level": "Unable to analyze"
+        bands = {}
+        for band, plan in self.plans.items():
+            counts, congestion = plan.congestion(by_band[band])
+            best = min(plan.recommend, key=lambda c: (congestion[plan.index[c]], c))
+            bands[band] = {
+                "bssids": len(by_band[band]),
+                "recommended_channel": best,
+                "channels": [{"channel": channel, "bssids": count, "congestion": round(score, 3)}
+                             for channel, count, score in zip(plan.channels, counts, congestion)]
             }
         
-        ssid = network_info.get("ssid", "Unknown")
-        auth = network_info.get("auth", "Unknown")
-        
-        # Check encryption
-        is_encrypted, encryption_status = self.check_encryption(auth)
-        analysis["encryption"] = {
-            "is_encrypted": is_encrypted,
-            "status": encryption_status
-        }
-        
-        # Check for attacks
-        attacks = self.check_known_attacks(ssid)
-        analysis["detected_attacks"] = attacks
-        
-        # Determine threat level
-        threat_score = 0
-        threats = []
-        
-        if is_encrypted is False:
-            threat_score += 40
-            threats.append("Unencrypted network - High vulnerability")
-        elif is_encrypted is None:
-            threat_score += 20
-            threats.append("Unknown encryption method")
-        
-        if attacks:
-            threat_score += 30
-            threats.extend(attacks)
-        
-        if "open" in ssid.lower() or "guest" in ssid.lower():
-            threat_score += 15
-            threats.append("Open/Guest network detected")
-        
-        # Determine threat level
-        if threat_score >= 60:
-            threat_level = "UNSAFE ⚠️"
-            color = "red"
-        elif threat_score >= 40:
-            threat_level = "RISKY ⚡"
-            color = "orange"
-        elif threat_score >= 20:
-            threat_level = "CAUTION 🛡️"
-            color = "yellow"
-        else:
-            threat_level = "SAFE ✓"
-            color = "green"
-        
-        analysis["threat_level"] = threat_level
-        analysis["threat_score"] = threat_score
-        analysis["threats"] = threats
-        analysis["color"] = color
-        
-        # Generate recommendations
-        recommendations = self.generate_recommendations(analysis)
-        analysis["recommendations"] = recommendations
-        
-        return analysis
+        result = {"bands": bands}
+        if active is not None:
+            band, channel = active
+            current = bands[band]["channels"][self.plans[band].index[channel]]
+            result["connected"] = {"band": band, "channel": channel, "congestion": current["congestion"],
+                                   "recommended_channel": bands[band]["recommended_channel"]}
+        return result
     
-    def generate_recommendations(self, analysis):
-        """Generate security recommendations"""
-        recommendations = []
-        
-        encryption = analysis.get("encryption", {})
-        if not encryption.get("is_encrypted"):
-            recommendations.append("Use a WPA3 or WPA2 encrypted network instead")
-        
-        threats = analysis.get("threats", [])
-        if threats:
-            recommendations.append("Consider connecting to a different, more secure network")
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, seq=self._seq)
+
+channel_congestion = ChannelCongestion()
+
+def content_etag(payload):
+    """Hash of the canonical JSON form of payload, stable across workers"""
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(body.encode('utf-8'), digest_size=12).hexdigest()
+
+class ConditionalGet:
+    """ETags for polled JSON endpoints, answering If-None-Match with 304"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._etags = {}
+        self.stats = {"requests": 0, "conditional": 0, "not_modified": 0}
+    
+    def evaluate(self, name, version, build, if_none_match):
+        """Return (status, payload, etag), where status 304 means the client's copy is current.
         
-        if "open" in analysis["network_info"].get("ssid", "").lower():
-            recommendations.append("Never enter sensitive information on open networks")
-            recommendations.append("Use a VPN when connected to public networks")
+        version is a cheap token that changes whenever the content may have; while it
+        is unchanged the cached ETag is trusted and build() is never called.
+        build returns (payload, status, etag_payload); only 200s get an ETag.
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            if if_none_match:
+                self.stats["conditional"] += 1
+            cached = self._etags.get(name)
         
-        if not recommendations:
-            recommendations.append("Network appears secure. Continue standard security practices")
-            recommendations.append("Avoid sharing sensitive data on any public network")
+        if cached is not None and cached[0] == version and if_none_match.contains_weak(cached[1]):
+            return self.not_modified(cached[1])
         
-        return recommendations
+        payload, status, etag_payload = build()
+        if status != 200:
+            return status, payload, None
+        etag = content_etag(etag_payload)
+        with self._lock:
+            self._etags[name] = (version, etag)
+        if if_none_match.contains_weak(etag):
+            return self.not_modified(etag)
+        return 200, payload, etag
+    
+    def not_modified(self, etag):
+        with self._lock:
+            self.stats["not_modified"] += 1
+        return 304, None, etag
+    
+    def respond(self, name, version, build):
+        """Flask response for evaluate() on the current request"""
+        status, payload, etag = self.evaluate(name, version, build, request.if_none_match)
+        if etag is None:
+            return jsonify(payload), status
+        response = jsonify(payload) if status == 200 else app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["not_modified_ratio"] = round(stats["not_modified"] / stats["requests"], 4) if stats["requests"] else 0.0
+        return stats
+
+conditional_get = ConditionalGet()
+
+def conditional_analysis(snapshot):
+    """(version, build) for conditional_get over the analysis of a scanner snapshot"""
+    scan = snapshot[1]
+    # Same scan, staleness, threat index and evil-twin findings means the same analysis
+    version = (scan["scan_count"], scan["stale"], threat_index.generation, evil_twin_detector.generation)
+    
+    def build():
+        result, status = current_analysis(snapshot)
+        # Scan timing changes on every request; the ETag covers the analysis itself
+        comparable = {k: v for k, v in result.items() if k != "scan"}
+        comparable["stale"] = scan["stale"]
+        return result, status, comparable
+    
+    return version, build
+
+def refresh_nearby(analyzer=None):
+    """Bring nearby_tracker up to date for a request; False if no scan is available
+    
+    Polls within one scan interval reuse the last scan, so however often clients
+    poll, a worker scans at most once per SCAN_INTERVAL.
+    """
+    return nearby_tracker.refresh(analyzer or WiFiSecurityAnalyzer(), SCAN_INTERVAL)
+
+async def refresh_nearby_async(analyzer=None):
+    """Coroutine version of refresh_nearby() for the ASGI handlers"""
+    return await nearby_tracker.refresh_async(analyzer or WiFiSecurityAnalyzer(), SCAN_INTERVAL)
+
+def conditional_nearby(available):
+    """(version, build) for conditional_get over the tracker's latest scan (sample data if unavailable)"""
+    if not available:
+        # Return sample networks if no networks found or command failed
+        networks = SAMPLE_NETWORKS
+        version = "sample"
+    else:
+        # The tracker only bumps its sequence when a scan differs from the last one
+        version, networks = nearby_tracker.snapshot()
+    
+    def build():
+        # Scored copies, so the tracker keeps comparing raw scan entries
+        payload = {"networks": with_threat_scores(networks)}
+        return payload, 200, payload
+    
+    return version, build
 
 @app.route("/")
 def home():
     return render_template("portal.html")
 
+def current_analysis(snapshot=None):
+    """Analyze the latest background scan snapshot; returns (result, HTTP status)"""
+    network_info, scan = snapshot or network_scanner.get_snapshot()
+    if network_info is None:
+        return {
+            "status": "error",
+            "message": "Network scan not ready yet",
+            "threat_level": "Unable to analyze",
+            "scan": scan
+        }, 503
+    
+    analyzer = WiFiSecurityAnalyzer()
+    result = analyzer.analyze_network(network_info)
+    history_store.record_analysis(result)
+    result["scan"] = scan
+    return result, 200
+
 @app.route('/api/analyze-wifi', methods=['GET'])
 def analyze_wifi():
     """Analyze current WiFi network security"""
     try:
-        analyzer = WiFiSecurityAnalyzer()
-        result = analyzer.analyze_network()
-        return jsonify(result)
+        version, build = conditional_analysis(network_scanner.get_snapshot())
+        return conditional_get.respond("analyze-wifi", version, build)
     except Exception as e:
         return jsonify({
             "status": "error",
@@ -344,6 +2747,185 @@ def analyze_wifi():
             "threat_level": "Unable to analyze"
         }), 500
 
+# Server-Sent Events limits
+# Request threads per worker; Procfile and render.yaml pass the same value to gunicorn --threads
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 64))
+# Threads kept free of SSE streams so REST routes and /api/health still get served
+SSE_RESERVED_THREADS = int(os.environ.get('SSE_RESERVED_THREADS', 16))
+# Every open stream pins a request thread, so the cap has to stay below WEB_THREADS
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS',
+                                         max(1, WEB_THREADS - min(SSE_RESERVED_THREADS, WEB_THREADS // 2))))
+SSE_QUEUE_SIZE = int(os.environ.get('SSE_QUEUE_SIZE', 16))
+SSE_KEEPALIVE = float(os.environ.get('SSE_KEEPALIVE', 15))
+
+class EventBroadcaster:
+    """One producer thread per worker fanning analysis and nearby deltas out to SSE subscribers"""
+    
+    # Queue marker telling a lagging subscriber to resend full state
+    RESYNC = object()
+    # Queue marker telling every subscriber the nearby list moved past the seq it last sent
+    NETWORKS = object()
+    
+    def __init__(self, interval=SCAN_INTERVAL, queue_size=SSE_QUEUE_SIZE, max_subscribers=SSE_MAX_SUBSCRIBERS):
+        self.interval = interval
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._pid = None
+        self._last_analysis = None
+        self._last_seq = 0
+        self.stats = {"events": 0, "dropped": 0, "resyncs": 0, "rejected": 0}
+    
+    def subscribe(self):
+        """Register a subscriber queue, or None when the limit is reached"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self.stats["rejected"] += 1
+                return None
+            q = queue.Queue(maxsize=self.queue_size)
+            self._subscribers.add(q)
+        self.start()
+        return q
+    
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+    
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="sse-producer", daemon=True)
+            self._thread.start()
+    
+    def publish(self, event, data):
+        """Queue an event for every subscriber without ever blocking the producer"""
+        self.broadcast(format_sse(event, data))
+    
+    def broadcast(self, message):
+        """Queue a formatted event or marker for every subscriber"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.stats["events"] += 1
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # Backpressure: drop this client's backlog and make it resync
+                with self._lock:
+                    self.stats["dropped"] += q.qsize()
+                    self.stats["resyncs"] += 1
+                try:
+                    while True:
+                        q.get_nowait()
+                except queue.Empty:
+                    pass
+                q.put_nowait(self.RESYNC)
+    
+    def _run(self):
+        while True:
+            if self._subscribers:
+                try:
+                    self.produce()
+                except Exception:
+                    # Keep the producer alive; the next cycle retries
+                    pass
+            time.sleep(self.interval)
+    
+    def produce(self):
+        """Compute one round of analysis and nearby deltas, publishing only what changed"""
+        result, status = current_analysis()
+        if status == 200:
+            # Scan metadata changes every cycle; compare the analysis itself
+            comparable = {k: v for k, v in result.items() if k != "scan"}
+            if comparable != self._last_analysis:
+                self._last_analysis = comparable
+                self.publish("analysis", result)
+        
+        if nearby_tracker.refresh(WiFiSecurityAnalyzer(), self.interval) and nearby_tracker.seq != self._last_seq:
+            self._last_seq = nearby_tracker.seq
+            # Subscribers joined at different seqs, so each one computes its own delta
+            self.broadcast(self.NETWORKS)
+    
+    def networks_event(self, since):
+        """(message, seq) bringing a subscriber from since to the tracker's seq; message is None if current"""
+        delta = nearby_tracker.changes_since(since)
+        if delta["reset"]:
+            return format_sse("networks", delta), delta["seq"]
+        if delta["seq"] == since:
+            return None, since
+        # since lets the client check the delta applies to the state it holds
+        return format_sse("networks", dict(delta, since=since)), delta["seq"]
+    
+    def initial_events(self):
+        """(events, seq): full current state for a new (or resyncing) subscriber"""
+        events = []
+        result, status = current_analysis()
+        if status == 200:
+            events.append(format_sse("analysis", result))
+        if nearby_tracker.refresh(WiFiSecurityAnalyzer(), self.interval) or nearby_tracker.seq:
+            message, seq = self.networks_event(None)
+            events.append(message)
+        else:
+            seq = None
+            events.append(format_sse("networks", {"seq": 0, "reset": True, "networks": SAMPLE_NETWORKS}))
+        return events, seq
+    
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["subscribers"] = len(self._subscribers)
+            stats["backlog"] = sum(q.qsize() for q in self._subscribers)
+        stats["max_subscribers"] = self.max_subscribers
+        stats["queue_size"] = self.queue_size
+        return stats
+
+def format_sse(event, data):
+    payload = json.dumps(data, separators=(',', ':'))
+    event_id = f"id: {data['seq']}\n" if isinstance(data, dict) and 'seq' in data else ""
+    return f"event: {event}\n{event_id}data: {payload}\n\n"
+
+event_broadcaster = EventBroadcaster()
+
+@app.route('/api/events', methods=['GET'])
+def event_stream():
+    """Server-Sent Events stream of analysis results and nearby-network deltas"""
+    q = event_broadcaster.subscribe()
+    if q is None:
+        return jsonify({"error": "Too many subscribers, poll the REST endpoints instead"}), 503
+    
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            events, seq = event_broadcaster.initial_events()
+            yield from events
+            while True:
+                try:
+                    message = q.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                if message is EventBroadcaster.RESYNC:
+                    events, seq = event_broadcaster.initial_events()
+                    yield from events
+                elif message is EventBroadcaster.NETWORKS:
+                    message, seq = event_broadcaster.networks_event(seq)
+                    if message is not None:
+                        yield message
+                else:
+                    yield message
+        finally:
+            event_broadcaster.unsubscribe(q)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 @app.route('/api/check-domain', methods=['POST'])
 def check_domain():
     """Check if a domain is safe"""
@@ -356,66 +2938,308 @@ def check_domain():
         
         analyzer = WiFiSecurityAnalyzer()
         result = analyzer.check_domain_safety(domain)
+        history_store.record_domain_checks([result])
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/check-domains', methods=['POST'])
+def check_domains():
+    """Check a batch of domains (JSON list or newline-delimited text)"""
+    try:
+        if request.is_json:
+            data = request.get_json()
+            domains = data.get('domains', []) if isinstance(data, dict) else data
+            if not isinstance(domains, list):
+                return jsonify({"error": "'domains' must be a list"}), 400
+        else:
+            # Read newline-delimited bodies line by line instead of buffering a copy
+            domains = [line.decode('utf-8', 'ignore') for line in request.stream]
+        
+        domains = [str(d).strip() for d in domains if d and str(d).strip()]
+        if not domains:
+            return jsonify({"error": "No domains provided"}), 400
+        if len(domains) > DOMAIN_BATCH_LIMIT:
+            return jsonify({"error": f"Too many domains (limit {DOMAIN_BATCH_LIMIT})"}), 413
+        
+        analyzer = WiFiSecurityAnalyzer()
+        results = analyzer.check_domains_batch(domains)
+        history_store.record_domain_checks(results)
+        return jsonify({
+            "count": len(results),
+            "unsafe": sum(1 for r in results if not r["safe"]),
+            "results": results
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Shown when no scan backend can list nearby networks (e.g. cloud hosting)
+SAMPLE_NETWORKS = [
+    {"name": "HomeNetwork", "status": "Available", "security": "WPA2"},
+    {"name": "GuestNetwork", "status": "Available", "security": "Open"},
+    {"name": "OfficeWiFi", "status": "Available", "security": "WPA3"}
+]
+
 @app.route('/api/networks-nearby', methods=['GET'])
 def get_nearby_networks():
     """Get list of nearby WiFi networks"""
     try:
-        analyzer = WiFiSecurityAnalyzer()
-        output = ""
-        
-        try:
-            if analyzer.is_windows():
-                result = subprocess.run(
-                    ['netsh', 'wlan', 'show', 'networks', 'mode=Bssid'],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                output = result.stdout if result.stdout else ""
-            else:
-                # On non-Windows systems, try nmcli but don't crash if it fails
-                try:
-                    result = subprocess.run(
-                        ['nmcli', 'device', 'wifi', 'list'],
-                        capture_output=True,
-                        text=True,
-                        timeout=10
-                    )
-                    output = result.stdout if result.stdout else ""
-                except (FileNotFoundError, OSError):
-                    # nmcli not available, will use demo data
-                    output = ""
-        except Exception as cmd_error:
-            # If command fails, use demo data
-            output = ""
-        
-        if not output or output.strip() == "":
-            # Return sample networks if no networks found or command failed
-            return jsonify({
-                "networks": [
-                    {"name": "HomeNetwork", "status": "Available", "security": "WPA2"},
-                    {"name": "GuestNetwork", "status": "Available", "security": "Open"},
-                    {"name": "OfficeWiFi", "status": "Available", "security": "WPA3"}
-                ]
-            })
-        
-        networks = parse_nearby_networks(output, analyzer.is_windows())
-        return jsonify({"networks": networks})
+        available = refresh_nearby()
+        version, build = conditional_nearby(available)
+        return conditional_get.respond("networks-nearby", version, build)
     except Exception as e:
         # Return sample networks if error occurs
         return jsonify({
-            "networks": [
-                {"name": "HomeNetwork", "status": "Available", "security": "WPA2"},
-                {"name": "GuestNetwork", "status": "Available", "security": "Open"},
-                {"name": "OfficeWiFi", "status": "Available", "security": "WPA3"}
-            ],
+            "networks": SAMPLE_NETWORKS,
             "note": "Using sample networks due to: " + str(e)
         })
 
+@app.route('/api/evil-twins', methods=['GET'])
+def evil_twins():
+    """SSIDs in the latest nearby scan whose BSSIDs disagree on security, vendor or channel"""
+    try:
+        available = refresh_nearby()
+        suspicious_only = request.args.get('all') is None
+        result = {"findings": evil_twin_detector.findings(suspicious_only)}
+        if not available:
+            result["note"] = "Nearby network scan unavailable"
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/channels', methods=['GET'])
+def channel_analysis():
+    """Per-band channel congestion from the latest nearby scan, with the least congested channel"""
+    try:
+        available = refresh_nearby()
+        seq, networks = nearby_tracker.snapshot()
+        result = dict(channel_congestion.analyze(seq, networks), seq=seq)
+        if not available:
+            result["note"] = "Nearby network scan unavailable"
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/signal-history', methods=['GET'])
+def signal_history_stats():
+    """Rolling signal statistics and smoothed distance per BSSID (?bssid= for one with samples)"""
+    try:
+        analyzer = WiFiSecurityAnalyzer()
+        refresh_nearby(analyzer)
+        bssid = request.args.get('bssid')
+        if bssid:
+            summary = signal_history.summary(bssid, with_samples=True)
+            if summary is None:
+                return jsonify({"error": "Unknown BSSID"}), 404
+            summaries = [summary]
+        else:
+            summaries = signal_history.summaries()
+        for summary in summaries:
+            summary["estimated_distance"] = analyzer.estimate_wifi_distance(summary["smoothed"])
+        if bssid:
+            return jsonify(summaries[0])
+        return jsonify({"networks": summaries, "samples_per_bssid": signal_history.size})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/lookalike', methods=['GET'])
+def lookalike():
+    """Protected domains or SSIDs that a name imitates"""
+    name = request.args.get('name', '').strip()
+    kind = request.args.get('kind', 'domain')
+    if not name:
+        return jsonify({"error": "No name provided"}), 400
+    if kind == 'ssid':
+        matches = [{"name": protected, "distance": distance} for distance, protected in ssid_lookalikes.nearest(name)]
+    elif kind == 'domain':
+        match = domain_lookalikes.match(name)
+        matches = [{"name": match["lookalike_of"], "distance": match["distance"]}] if match else []
+    else:
+        return jsonify({"error": "kind must be 'domain' or 'ssid'"}), 400
+    return jsonify({"name": name, "kind": kind, "matches": matches})
+
+@app.route('/api/history/<kind>', methods=['GET'])
+def history_entries(kind):
+    """Stored scans, analyses, domain checks or device logs, newest first"""
+    if kind not in HISTORY_TABLES:
+        return jsonify({"error": f"kind must be one of: {', '.join(HISTORY_TABLES)}"}), 404
+    if not history_store.start():
+        return jsonify({"error": "History store unavailable", "detail": history_store.last_error}), 503
+    key_column = HISTORY_TABLES[kind][1]
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    try:
+        entries = history_store.query(kind, key=request.args.get(key_column),
+                                      since=request.args.get('since', type=float),
+                                      until=request.args.get('until', type=float), limit=limit)
+        return jsonify({"kind": kind, "count": len(entries), "entries": entries})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/networks-nearby/changes', methods=['GET'])
+def nearby_network_changes():
+    """Nearby-network deltas since the client's last sequence number"""
+    try:
+        since = request.args.get('since', type=int)
+        available = refresh_nearby()
+        result = nearby_tracker.changes_since(since)
+        if not available:
+            result["note"] = "Nearby network scan unavailable"
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Fields requested from nmcli, in the order parse_nmcli_terse() expects them
+NMCLI_FIELDS = 'ACTIVE,SSID,BSSID,CHAN,FREQ,RATE,SIGNAL,SECURITY'
+
+def security_label(security):
+    """Reduce an auth/security string to WPA3, WPA2, WPA, WEP or Open"""
+    upper = security.upper()
+    for label in ('WPA3', 'WPA2', 'WPA', 'WEP'):
+        if label in upper:
+            return label
+    return "Open"
+
+def parse_nmcli_terse(output):
+    """Parse `nmcli --terse --fields NMCLI_FIELDS device wifi list` in one pass
+    
+    Accepts the whole output or any iterable of lines.
+    """
+    if not isinstance(output, str):
+        output = "\n".join(output)
+    escaped = '\\' in output
+    if escaped:
+        # Park escaped characters on placeholders once for the whole output,
+        # so every line is a single str.split in C
+        output = output.replace('\\\\', '\x00').replace('\\:', '\x01')
+    # Scans repeat a handful of security strings; label each one once
+    securities = {}
+    networks = []
+    for line in output.splitlines():
+        fields = line.split(':')
+        if len(fields) != 8:
+            if len(fields) < 8:
+                continue
+            fields = fields[:8]
+        active, ssid, bssid, channel, frequency, rate, signal, security = fields
+        if escaped:
+            if '\x01' in ssid or '\x00' in ssid:
+                ssid = ssid.replace('\x01', ':').replace('\x00', '\\')
+            bssid = bssid.replace('\x01', ':')
+        labels = securities.get(security)
+        if labels is None:
+            auth = security.strip()
+            # nmcli prints '--' (or nothing) for open networks; both must score as unencrypted
+            labels = securities[security] = (
+                (security_label(auth), auth) if auth not in ('', '--') else ("Open", "Open"))
+        frequency = frequency.partition(' ')[0]
+        rate = rate.partition(' ')[0]
+        networks.append({
+            "name": ssid or "Unknown",
+            "status": "Available",
+            "security": labels[0],
+            "auth": labels[1],
+            "bssid": bssid.lower(),
+            "channel": int(channel) if channel.isdigit() else None,
+            "frequency": int(frequency) if frequency.isdigit() else None,
+            "rate": int(rate) if rate.isdigit() else None,
+            "signal": int(signal) if signal.isdigit() else 0,
+            "active": active == 'yes'
+        })
+    return networks
+
+# The usual `netsh wlan show networks mode=Bssid` layout, read by one findall over the whole dump.
+# Every match starts at the literal "SSID " (so the engine skips rate lines in C). The lookbehind
+# makes it a BSSID header with its Signal/Radio type/[Band]/Channel lines; otherwise it is an SSID
+# header (the only match that fills the number group) with its Network type/Authentication/Encryption lines.
+NETSH_LAYOUT = re.compile(
+    r'SSID (?:(?<=BSSID )\d+ *: *(\S*)'
+    r'(?:\r?\n +Signal +: (\d+)%\r?\n +Radio type +: (\S+)\r?\n +'
+    r'(?:Band +: ([^\r\n]*)\r?\n +)?Channel +: (\d+))?'
+    r'|(?<!B)(\d+) *:[ \t]*([^\r\n]*)'
+    r'(?:\r?\n +Network type[^\n]*\n +Authentication +: ([^\r\n]*)\r?\n +Encryption +: ([^\r\n]*))?)')
+# SSID headers start a line, BSSID headers are indented
+NETSH_SSID_SPLIT = re.compile(r'\n(?=SSID \d)')
+NETSH_BSSID_SPLIT = re.compile(r'\n[ \t]+BSSID \d+[ \t]*:')
+# Per-BSSID fields, in the order netsh prints them (Band is missing on older Windows)
+NETSH_BSSID_FIELDS = ('Signal', 'Radio type', 'Band', 'Channel')
+
+def netsh_fields(block, keys):
+    """Values of the first 'key : value' line for each key in a netsh block (None if absent)"""
+    values = []
+    for key in keys:
+        start = block.find(key)
+        if start < 0:
+            values.append(None)
+            continue
+        colon = block.find(':', start)
+        end = block.find('\n', colon)
+        values.append((block[colon + 1:end] if end >= 0 else block[colon + 1:]).strip())
+    return values
+
+def parse_netsh_networks(output):
+    """Parse `netsh wlan show networks mode=Bssid`, one entry per BSSID (SSIDs without any get bssid None)
+    
+    Python only sees one tuple per SSID and per BSSID from NETSH_LAYOUT. A dump
+    with any block outside that layout is parsed field by field instead.
+    """
+    networks = []
+    append = networks.append
+    name = pending = None
+    for bssid, signal, radio_type, band, channel, number, ssid, ssid_auth, ssid_encryption in NETSH_LAYOUT.findall(output):
+        if number:
+            if pending is not None:
+                append(pending)
+            if not ssid_auth:
+                return parse_netsh_blocks(output)
+            # Hidden networks have an empty SSID
+            name = ssid.rstrip() or "Unknown"
+            auth = ssid_auth.rstrip() or "Unknown"
+            encryption = ssid_encryption.rstrip() or "Unknown"
+            security = encryption if encryption != "Unknown" else auth
+            pending = {"name": name, "status": "Available", "security": security,
+                       "auth": auth, "encryption": encryption, "bssid": None}
+            continue
+        if not signal or not bssid or name is None:
+            return parse_netsh_blocks(output)
+        pending = None
+        append({"name": name, "status": "Available", "security": security, "auth": auth,
+                "encryption": encryption, "bssid": bssid.lower(), "signal": int(signal),
+                "radio_type": radio_type, "band": band.rstrip() or None, "channel": int(channel)})
+    if pending is not None:
+        append(pending)
+    return networks
+
+def parse_netsh_blocks(output):
+    """Field-by-field parse_netsh_networks() for dumps NETSH_LAYOUT does not fit"""
+    networks = []
+    for section in NETSH_SSID_SPLIT.split('\n' + output)[1:]:
+        header, *blocks = NETSH_BSSID_SPLIT.split(section)
+        ssid_line, _, header = header.partition('\n')
+        auth, encryption = netsh_fields(header, ('Authentication', 'Encryption'))
+        auth = auth or "Unknown"
+        encryption = encryption or "Unknown"
+        base = {
+            "name": ssid_line.partition(':')[2].strip() or "Unknown",
+            "status": "Available",
+            "security": encryption if encryption != "Unknown" else auth,
+            "auth": auth,
+            "encryption": encryption
+        }
+        if not blocks:
+            networks.append(dict(base, bssid=None))
+        for block in blocks:
+            bssid, _, body = block.partition('\n')
+            signal, radio_type, band, channel = netsh_fields(body, NETSH_BSSID_FIELDS)
+            signal = (signal or '').rstrip('%')
+            network = base.copy()
+            network["bssid"] = bssid.strip().lower()
+            network["signal"] = int(signal) if signal.isdigit() else 0
+            network["radio_type"] = radio_type
+            network["band"] = band
+            network["channel"] = int(channel) if channel and channel.isdigit() else None
+            networks.append(network)
+    return networks
+
 def parse_nearby_networks(output, is_windows):
     """Parse nearby networks from command output"""
     networks = []
@@ -426,70 +3250,10 @@ def parse_nearby_networks(output, is_windows):
     try:
         if is_windows:
             # Parse Windows netsh output with security info
-            # Extract SSID and security info
-            ssid_pattern = r'SSID \d+ : (.+)'
-            auth_pattern = r'Authentication\s+:\s+(.+)'
-            encryption_pattern = r'Encryption\s+:\s+(.+)'
-            
-            ssids = re.findall(ssid_pattern, output)
-            
-            # Split output by SSID sections
-            ssid_sections = re.split(r'SSID \d+ :', output)
-            
-            for section in ssid_sections[1:]:  # Skip first empty split
-                lines = section.strip().split('\n')
-                ssid = lines[0].strip() if lines else "Unknown"
-                
-                # Extract authentication and encryption from this section
-                auth = "Unknown"
-                encryption = "Unknown"
-                
-                for line in lines:
-                    if 'Authentication' in line:
-                        auth_match = re.search(r':\s+(.+)', line)
-                        if auth_match:
-                            auth = auth_match.group(1).strip()
-                    if 'Encryption' in line:
-                        enc_match = re.search(r':\s+(.+)', line)
-                        if enc_match:
-                            encryption = enc_match.group(1).strip()
-                
-                if ssid:
-                    networks.append({
-                        "name": ssid,
-                        "status": "Available",
-                        "security": encryption if encryption != "Unknown" else auth,
-                        "auth": auth,
-                        "encryption": encryption
-                    })
+            networks = parse_netsh_networks(output)
         else:
-            # Parse Linux nmcli output
-            lines = output.split('\n')[1:] if output else []
-            for line in lines:
-                if line.strip():
-                    parts = line.split()
-                    if len(parts) > 0:
-                        # Extract SSID and try to find security info
-                        ssid = parts[0] if len(parts) > 0 else "Unknown"
-                        
-                        # Look for security indicators in the line
-                        security = "Open"
-                        if 'WPA3' in line.upper():
-                            security = "WPA3"
-                        elif 'WPA2' in line.upper():
-                            security = "WPA2"
-                        elif 'WPA' in line.upper():
-                            security = "WPA"
-                        elif 'WEP' in line.upper():
-                            security = "WEP"
-                        elif 'OPEN' in line.upper() or '--' in line:
-                            security = "Open"
-                        
-                        networks.append({
-                            "name": ssid,
-                            "status": "Available",
-                            "security": security
-                        })
+            # Parse Linux nmcli terse output
+            networks = parse_nmcli_terse(output)
     except Exception as e:
         # If parsing fails, return empty list
         return []
@@ -501,6 +3265,39 @@ def health_check():
     """Health check endpoint"""
     return jsonify({"status": "Backend is running", "timestamp": datetime.now().isoformat()})
 
+@app.route('/api/stats', methods=['GET'])
+def service_stats():
+    """Runtime statistics for the scanner and request coalescing"""
+    return jsonify({
+        "scanner": network_scanner.get_stats(),
+        "single_flight": single_flight.get_stats(),
+        "async_single_flight": async_single_flight.get_stats(),
+        "probe": probe_backend.get_stats(),
+        "nearby_tracker": nearby_tracker.get_stats(),
+        "evil_twins": evil_twin_detector.get_stats(),
+        "signal_history": signal_history.get_stats(),
+        "channels": channel_congestion.get_stats(),
+        "events": event_broadcaster.get_stats(),
+        "conditional_get": conditional_get.get_stats(),
+        "history": history_store.get_stats(),
+        "dns_cache": dns_cache.get_stats(),
+        "domain_index": threat_index.domains.get_stats(),
+        "threat_matcher": {"patterns": threat_index.keywords.size, "states": threat_index.keywords.states},
+        "lookalikes": {"domains": domain_lookalikes.get_stats(), "ssids": ssid_lookalikes.get_stats()},
+        "feeds": feed_manager.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/feeds', methods=['GET'])
+def feed_status():
+    """Threat feed sizes, index build time and generation"""
+    return jsonify(feed_manager.get_stats())
+
+@app.before_request
+def start_feed_watcher():
+    # Started lazily so each gunicorn worker runs its own watcher after fork
+    feed_manager.start()
+
 # Admin Authentication
 ADMIN_CREDENTIALS = {
     'admin': 'admin123'  # In production, use hashed passwords
@@ -562,12 +3359,8 @@ def admin_stats():
 
 @app.route("/log/<device>")
 def log_device(device):
-    try:
-        with open("connections.txt", "a") as f:
-            f.write(device + "\n")
-    except Exception as e:
-        # Silently fail if file can't be written (common in cloud hosting)
-        pass
+    # Queued for the history writer; dropped if the store is unavailable (common in cloud hosting)
+    history_store.record_device(device, request.remote_addr)
     return "Logged"
 
 if __name__ == '__main__':
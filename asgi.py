@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point - serves the app.py routes from an event loop
+
+The routes that wait on I/O (analysis, nearby scans, domain checks) are
+coroutines that await the scan subprocess and DNS lookups, so one process
+can hold hundreds of slow requests without a thread for each. Every other
+route (admin pages and login, stats, batch checks, SSE, /log) runs on the
+Flask app unchanged, through a WSGI bridge on a thread pool.
+
+Usage:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from werkzeug.http import parse_etags, quote_etag
+
+import app as wsgi
+
+# Threads for routes served by the Flask app (each open /api/events stream holds one).
+# Defaults to WEB_THREADS, which SSE_MAX_SUBSCRIBERS is derived from
+ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', wsgi.WEB_THREADS))
+
+
+class Request:
+    """The parts of an ASGI HTTP request the native handlers use"""
+
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                        for name, value in scope["headers"]}
+        self.body = body
+
+
+async def read_body(receive):
+    """Collect the request body from http.request messages"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def conditional(request, name, version, build):
+    """Handler result for wsgi.conditional_get, with the same ETag headers as the Flask routes"""
+    if_none_match = parse_etags(request.headers.get('if-none-match'))
+    status, payload, etag = wsgi.conditional_get.evaluate(name, version, build, if_none_match)
+    if etag is None:
+        return status, payload, {}
+    return status, payload, {"etag": quote_etag(etag, weak=True), "cache-control": "private, no-cache"}
+
+
+async def health_check(request):
+    return 200, {"status": "Backend is running", "timestamp": datetime.now().isoformat()}, {}
+
+
+async def analyze_wifi(request):
+    try:
+        # Only the first request in a process waits for the initial background scan
+        snapshot = await asyncio.get_running_loop().run_in_executor(None, wsgi.network_scanner.get_snapshot)
+        version, build = wsgi.conditional_analysis(snapshot)
+        return conditional(request, "analyze-wifi", version, build)
+    except Exception as e:
+        return 500, {"status": "error", "message": str(e), "threat_level": "Unable to analyze"}, {}
+
+
+async def check_domain(request):
+    try:
+        data = json.loads(request.body)
+        domain = data.get('domain', '')
+        if not domain:
+            return 400, {"error": "No domain provided"}, {}
+        analyzer = wsgi.WiFiSecurityAnalyzer()
+        result = await analyzer.check_domain_safety_async(domain)
+        wsgi.history_store.record_domain_checks([result])
+        return 200, result, {}
+    except Exception as e:
+        return 500, {"error": str(e)}, {}
+
+
+async def get_nearby_networks(request):
+    try:
+        available = await wsgi.refresh_nearby_async()
+        version, build = wsgi.conditional_nearby(available)
+        return conditional(request, "networks-nearby", version, build)
+    except Exception as e:
+        return 200, {"networks": wsgi.SAMPLE_NETWORKS, "note": "Using sample networks due to: " + str(e)}, {}
+
+
+ROUTES = {
+    ("GET", "/api/health"): health_check,
+    ("GET", "/api/analyze-wifi"): analyze_wifi,
+    ("POST", "/api/check-domain"): check_domain,
+    ("GET", "/api/networks-nearby"): get_nearby_networks,
+}
+
+
+class WSGIBridge:
+    """Runs a WSGI app on a thread pool, streaming its response back to the event loop"""
+
+    def __init__(self, wsgi_app, threads=ASGI_WSGI_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi-bridge")
+
+    @staticmethod
+    def environ(scope, body):
+        """PEP 3333 environ for an ASGI HTTP scope"""
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode('utf-8').decode('latin-1'),
+            "PATH_INFO": scope["path"].encode('utf-8').decode('latin-1'),
+            "QUERY_STRING": scope.get("query_string", b"").decode('latin-1'),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            key = name.decode('latin-1').upper().replace('-', '_')
+            if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = "HTTP_" + key
+            value = value.decode('latin-1')
+            environ[key] = environ[key] + "," + value if key in environ else value
+        return environ
+
+    async def __call__(self, scope, body, receive, send):
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue()
+        disconnected = threading.Event()
+        environ = self.environ(scope, body)
+
+        def emit(message):
+            loop.call_soon_threadsafe(messages.put_nowait, message)
+
+        def run():
+            # Headers go out with the first body chunk, so start_response may still be replaced
+            pending = {}
+
+            def write(data):
+                if "start" in pending:
+                    emit(pending.pop("start"))
+                if data:
+                    emit({"type": "http.response.body", "body": data, "more_body": True})
+
+            def start_response(status, headers, exc_info=None):
+                pending["start"] = {
+                    "type": "http.response.start",
+                    "status": int(status.split(' ', 1)[0]),
+                    "headers": [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+                }
+                return write
+
+            try:
+                result = self.wsgi_app(environ, start_response)
+                try:
+                    for chunk in result:
+                        # Lets streaming responses (SSE) run their cleanup once the client is gone
+                        if disconnected.is_set():
+                            break
+                        write(chunk)
+                finally:
+                    if hasattr(result, 'close'):
+                        result.close()
+                write(b"")
+            except Exception as e:
+                emit(e)
+            emit(None)
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        worker = loop.run_in_executor(self.executor, run)
+        started = False
+        try:
+            while True:
+                message = await messages.get()
+                if message is None:
+                    break
+                if isinstance(message, Exception):
+                    if not started:
+                        await send_json(send, {"error": str(message)}, 500)
+                        return
+                    break
+                started = True
+                await send(message)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            watcher.cancel()
+            disconnected.set()
+            await worker
+
+
+async def send_json(send, payload, status=200, headers=None):
+    """Send a JSON response encoded like Flask's jsonify (payload None sends an empty body)"""
+    body = b"" if payload is None else (wsgi.app.json.dumps(payload, separators=(",", ":")) + "\n").encode('utf-8')
+    raw = [(name.encode('latin-1'), value.encode('latin-1')) for name, value in (headers or {}).items()]
+    if payload is not None:
+        raw.append((b"content-type", b"application/json"))
+    raw.append((b"content-length", str(len(body)).encode('latin-1')))
+    await send({"type": "http.response.start", "status": status, "headers": raw})
+    await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+class ASGIApp:
+    """Native coroutine handlers for ROUTES, the Flask app for everything else"""
+
+    def __init__(self, wsgi_app, routes=ROUTES):
+        self.routes = routes
+        self.bridge = WSGIBridge(wsgi_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        # Same lazy per-worker start as the Flask before_request hook
+        wsgi.feed_manager.start()
+        body = await read_body(receive)
+        handler = self.routes.get((scope["method"], scope["path"]))
+        if handler is None:
+            await self.bridge(scope, body, receive, send)
+            return
+
+        request = Request(scope, body)
+        status, payload, headers = await handler(request)
+        if "origin" in request.headers:
+            # Match the CORS(app) defaults the Flask routes get
+            headers["access-control-allow-origin"] = "*"
+        await send_json(send, payload, status, headers)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                wsgi.feed_manager.start()
+                wsgi.network_scanner.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.bridge.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+app = ASGIApp(wsgi.app)
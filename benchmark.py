@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Performance Benchmarks - Measures lookup and parsing throughput of app.py components
+
+Usage:
+    python benchmark.py              # run every benchmark
+    python benchmark.py blocklist    # run one benchmark by name
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+
+# Benchmarks never touch real WiFi hardware: serve recorded probe outputs
+os.environ.setdefault('PROBE_BACKEND', 'replay')
+# ...and keep their history database out of the working tree
+os.environ.setdefault('HISTORY_DB', os.path.join(tempfile.gettempdir(), 'benchmark-history.db'))
+
+import app
+from blocklist import compile_blocklist
+
+
+def throughput(fn, items, min_seconds=0.5):
+    """Call fn on each item (repeating the list) for at least min_seconds, return calls/sec"""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        for item in items:
+            fn(item)
+        calls += len(items)
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def list_scan(blocklist):
+    """The original check_domain_safety loop: substring test against every entry"""
+    def scan(domain):
+        domain_lower = domain.lower()
+        for malicious in blocklist:
+            if malicious in domain_lower:
+                return malicious
+        return None
+    return scan
+
+
+def bench_blocklist():
+    """Clean-domain lookups: list scan vs trie vs mmap file"""
+    print("📊 Blocklist lookup throughput (clean domains, lookups/sec)")
+    print(f"{'entries':>10} {'list scan':>12} {'trie':>12} {'mmap':>12}")
+
+    probes = [f"www.clean-site{i}.example.org" for i in range(200)]
+    for size in (10_000, 100_000, 1_000_000):
+        blocklist = [f"bad-host{i}.threat{i % 997}.net" for i in range(size)]
+
+        # The list scan is O(entries) per lookup, so probe it with fewer domains
+        scan_rate = throughput(list_scan(blocklist), probes[:max(1, 2_000_000 // size)], 0.2)
+
+        trie = app.DomainIndex(blocklist)
+        trie_rate = throughput(trie.match, probes)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocklist.bin")
+            compile_blocklist(blocklist, path)
+            mapped = app.MmapDomainIndex(path)
+            mmap_rate = throughput(mapped.match, probes)
+            del mapped
+
+        print(f"{size:>10,} {scan_rate:>12,.0f} {trie_rate:>12,.0f} {mmap_rate:>12,.0f}")
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'probes')
+
+
+def nmcli_outputs(count):
+    """The recorded `nmcli device wifi list` scan in the tabular and terse formats, repeated to count rows"""
+    with open(os.path.join(FIXTURES, 'linux', 'nmcli_wifi_list_tabular.txt'), encoding='utf-8') as f:
+        header, *table = f.read().splitlines()
+    with open(os.path.join(FIXTURES, 'linux', 'nmcli_wifi_list.txt'), encoding='utf-8') as f:
+        terse = f.read().splitlines()
+    table = [header] + [table[i % len(table)] for i in range(count)]
+    terse = [terse[i % len(terse)] for i in range(count)]
+    return "\n".join(table) + "\n", "\n".join(terse) + "\n"
+
+
+def legacy_parse_nmcli(output):
+    """The original whitespace-split parser for tabular nmcli output"""
+    networks = []
+    for line in output.split('\n')[1:]:
+        if line.strip():
+            parts = line.split()
+            if len(parts) > 0:
+                ssid = parts[0]
+                security = "Open"
+                if 'WPA3' in line.upper():
+                    security = "WPA3"
+                elif 'WPA2' in line.upper():
+                    security = "WPA2"
+                elif 'WPA' in line.upper():
+                    security = "WPA"
+                elif 'WEP' in line.upper():
+                    security = "WEP"
+                networks.append({"name": ssid, "status": "Available", "security": security})
+    return networks
+
+
+def bench_nmcli():
+    """Linux nearby-network parsing: original tabular parser vs terse single-pass parser"""
+    print("📊 nmcli parser throughput (scans parsed/sec)")
+    print(f"{'networks':>10} {'tabular (old)':>15} {'terse (new)':>15} {'terse networks/sec':>20}")
+    for count in (7, 100, 1000):
+        table, terse = nmcli_outputs(count)
+        old_rate = throughput(legacy_parse_nmcli, [table])
+        new_rate = throughput(app.parse_nmcli_terse, [terse])
+        assert len(app.parse_nmcli_terse(terse)) == count
+        print(f"{count:>10,} {old_rate:>15,.0f} {new_rate:>15,.0f} {new_rate * count:>20,.0f}")
+
+
+def netsh_output(ssid_count):
+    """The recorded `netsh wlan show networks mode=Bssid` dump, its SSID blocks repeated to ssid_count"""
+    with open(os.path.join(FIXTURES, 'windows', 'netsh_networks.txt'), encoding='utf-8') as f:
+        header, *blocks = re.split(r'\n(?=SSID \d+ :)', f.read())
+    ssids = [re.sub(r'^SSID \d+', f'SSID {i + 1}', blocks[i % len(blocks)]) for i in range(ssid_count)]
+    return "\n".join([header] + ssids)
+
+
+def legacy_parse_netsh(output):
+    """The original multi-pass regex parser (one entry per SSID, no BSSID details)"""
+    networks = []
+    re.findall(r'SSID \d+ : (.+)', output)
+    for section in re.split(r'SSID \d+ :', output)[1:]:
+        lines = section.strip().split('\n')
+        ssid = lines[0].strip() if lines else "Unknown"
+        auth = "Unknown"
+        encryption = "Unknown"
+        for line in lines:
+            if 'Authentication' in line:
+                auth_match = re.search(r':\s+(.+)', line)
+                if auth_match:
+                    auth = auth_match.group(1).strip()
+            if 'Encryption' in line:
+                enc_match = re.search(r':\s+(.+)', line)
+                if enc_match:
+                    encryption = enc_match.group(1).strip()
+        if ssid:
+            networks.append({"name": ssid, "status": "Available",
+                             "security": encryption if encryption != "Unknown" else auth,
+                             "auth": auth, "encryption": encryption})
+    return networks
+
+
+def bench_netsh():
+    """Windows nearby-network parsing: original regex parser vs single-pass parser"""
+    print("📊 netsh parser throughput (recorded dump)")
+    print(f"{'SSIDs':>8} {'dump KB':>9} {'regex (old) MB/s':>18} {'single-pass MB/s':>18} {'BSSIDs/sec':>12}")
+    for count in (4, 100, 1000, 5000):
+        dump = netsh_output(count)
+        size_mb = len(dump) / 1_000_000
+        old_rate = throughput(legacy_parse_netsh, [dump])
+        new_rate = throughput(app.parse_netsh_networks, [dump])
+        bssids = len(app.parse_netsh_networks(dump))
+        print(f"{count:>8,} {len(dump) / 1024:>9,.0f} {old_rate * size_mb:>18,.1f} "
+              f"{new_rate * size_mb:>18,.1f} {new_rate * bssids:>12,.0f}")
+
+
+def synthetic_networks(count):
+    """Nearby-scan entries with a mix of security modes and suspicious SSIDs"""
+    names = ["CorpNet", "Free_Airport_WiFi", "Home_ext", "Guest Lounge", "OpenNet", "xy", "Public Hotspot", "Lab"]
+    auths = ["WPA2-Personal", "WPA3-Personal", "Open", "WEP", "", "802.1X"]
+    return [{"name": f"{names[i % len(names)]} {i}" if i % 5 else names[i % len(names)],
+             "auth": auths[i % len(auths)], "signal": 20 + i % 80}
+            for i in range(count)]
+
+
+def bench_scoring():
+    """Nearby-network threat scoring: check_encryption/check_known_attacks loop vs one NumPy pass"""
+    backend = "NumPy" if app.np is not None else "no NumPy, loop fallback"
+    print(f"📊 Threat scoring throughput ({backend}, networks/sec)")
+    print(f"{'networks':>10} {'loop':>14} {'vectorized':>14} {'speedup':>9}")
+    analyzer = app.WiFiSecurityAnalyzer()
+    for count in (100, 1000, 10_000):
+        networks = synthetic_networks(count)
+        assert app.score_networks(networks, analyzer) == app.score_networks_loop(networks, analyzer)
+        loop_rate = throughput(lambda n: app.score_networks_loop(n, analyzer), [networks]) * count
+        vector_rate = throughput(lambda n: app.score_networks(n, analyzer), [networks]) * count
+        print(f"{count:>10,} {loop_rate:>14,.0f} {vector_rate:>14,.0f} {vector_rate / loop_rate:>8.1f}x")
+
+
+def office_scan(bssid_count, shift=0):
+    """A dense floor: a few SSIDs on many APs, plus one rogue open copy of the first SSID"""
+    networks = []
+    for i in range(bssid_count):
+        networks.append({"name": f"Corp-{i % 20}", "bssid": f"00:1a:2b:{i >> 8 & 0xff:02x}:{i & 0xff:02x}:00",
+                         "security": "WPA2", "auth": "WPA2 802.1X", "channel": (1, 6, 11, 36, 44)[i % 5],
+                         "signal": 30 + (i * 7 + shift) % 60})
+    networks.append({"name": "corp-0", "bssid": "de:ad:be:ef:00:01", "security": "Open", "auth": "",
+                     "channel": 6, "signal": 90})
+    return networks
+
+
+def bench_eviltwin():
+    """Evil-twin index update time per scan on dense floors"""
+    print("📊 Evil-twin index (scans/sec)")
+    print(f"{'BSSIDs':>8} {'scans/sec':>12} {'BSSIDs/sec':>14} {'flagged SSIDs':>14}")
+    for count in (100, 500, 5000):
+        detector = app.EvilTwinDetector()
+        scans = [office_scan(count, shift) for shift in (0, 1)]
+        rate = throughput(detector.update, scans)
+        flagged = sum(f["suspicious"] for f in detector.findings())
+        print(f"{count:>8,} {rate:>12,.0f} {rate * (count + 1):>14,.0f} {flagged:>14}")
+
+
+def bench_lookalike():
+    """Look-alike queries: pairwise edit distance vs the deletion-variant index"""
+    print("📊 Look-alike lookup (queries/sec)")
+    print(f"{'names':>10} {'build s':>9} {'index MB':>9} {'pairwise':>10} {'index':>10} {'µs/query':>9}")
+    for size in (1_000, 10_000, 100_000):
+        names = [f"brand{i:x}net{i % 97}" for i in range(size)]
+        start = time.perf_counter()
+        index = app.LookalikeIndex(names)
+        build = time.perf_counter() - start
+        # Homoglyph and one-substitution copies of protected names, plus unrelated names
+        queries = [names[i].replace("a", "4") if i % 3 == 0 else names[i][:-1] + "x" if i % 3 == 1 else f"clean{i}x"
+                   for i in range(0, size, max(1, size // 300))]
+        skeletons = [app.skeleton(n) for n in names]
+
+        def pairwise(query):
+            folded = app.skeleton(query)
+            return [name for name, other in zip(names, skeletons) if app.lookalike_distance(folded, other) <= 1]
+
+        pairwise_rate = throughput(pairwise, queries[:3], 0.2)
+        index_rate = throughput(index.nearest, queries)
+        assert index.nearest(queries[0])
+        print(f"{size:>10,} {build:>9.2f} {index.memory_bytes() / 1e6:>9.1f} {pairwise_rate:>10,.0f} "
+              f"{index_rate:>10,.0f} {1e6 / index_rate:>9.1f}")
+
+
+def bench_channels():
+    """Channel congestion for one scan, NumPy overlap matrix vs pure-Python fallback"""
+    print("📊 Channel congestion (scans analyzed/sec)")
+    print(f"{'BSSIDs':>8} {'python':>10} {'numpy':>10}")
+    channels = [(c, 2407 + 5 * c) for c in (1, 6, 11, 3)] + [(c, 5000 + 5 * c) for c in app.CHANNELS_5GHZ]
+    for count in (100, 1000, 5000):
+        networks = [{"channel": channels[i % len(channels)][0], "frequency": channels[i % len(channels)][1],
+                     "signal": 20 + i % 80} for i in range(count)]
+        numpy_rate = throughput(app.ChannelCongestion().compute, [networks]) if app.np is not None else 0
+        saved, app.np = app.np, None
+        try:
+            # Plans built without NumPy keep their overlap matrix as nested lists
+            plans = {band: app.ChannelPlan(band, plan.channels, plan.recommend, plan.base_mhz, plan.width_mhz)
+                     for band, plan in app.CHANNEL_PLANS.items()}
+            fallback = app.ChannelCongestion(plans)
+            python_rate = throughput(fallback.compute, [networks])
+            expected = fallback.compute(networks)
+        finally:
+            app.np = saved
+        if app.np is not None:
+            result = app.ChannelCongestion().compute(networks)
+            assert all(result["bands"][b]["recommended_channel"] == expected["bands"][b]["recommended_channel"]
+                       for b in result["bands"])
+        print(f"{count:>8,} {python_rate:>10,.0f} {numpy_rate:>10,.0f}")
+
+
+def bench_history():
+    """History writes: one commit per row vs the store's batched background writer"""
+    print("📊 History store (rows written/sec)")
+    print(f"{'rows':>8} {'per-row':>10} {'batched':>10} {'record() µs':>12}")
+    rows = [(time.time(), f"Net{i % 40}", f"02:00:00:00:{i // 256 % 256:02x}:{i % 256:02x}", 1 + i % 11,
+             20 + i % 80, "WPA2") for i in range(5000)]
+    columns = app.HISTORY_TABLES["scans"][0]
+    insert = f"INSERT INTO scans ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (500, 5000):
+            store = app.HistoryStore(os.path.join(directory, f"per-row-{count}.db"))
+            connection = store.connect()
+            connection.executescript(app.HISTORY_SCHEMA)
+            start = time.perf_counter()
+            for row in rows[:count]:
+                with connection:
+                    connection.execute(insert, row)
+            per_row = count / (time.perf_counter() - start)
+            connection.close()
+            
+            # Request threads only enqueue; time both that and the writer draining it
+            store = app.HistoryStore(os.path.join(directory, f"batched-{count}.db"), queue_size=count,
+                                     flush_interval=0.01)
+            store.start()
+            start = time.perf_counter()
+            for row in rows[:count]:
+                store.record("scans", [row])
+            enqueue = time.perf_counter() - start
+            while store.get_stats()["written"] < count:
+                time.sleep(0.001)
+            batched = count / (time.perf_counter() - start)
+            assert len(store.query("scans", limit=count)) == count
+            print(f"{count:>8,} {per_row:>10,.0f} {batched:>10,.0f} {enqueue / count * 1e6:>12.1f}")
+
+
+def bench_http():
+    """Request throughput of the Flask routes against the replay probe backend"""
+    print(f"📊 HTTP throughput with {app.probe_backend.name} probes "
+          f"(latency {app.PROBE_LATENCY}s, failure rate {app.PROBE_FAILURE_RATE})")
+    client = app.app.test_client()
+    routes = [
+        ("GET", "/api/health", None),
+        ("GET", "/api/analyze-wifi", None),
+        ("GET", "/api/networks-nearby", None),
+        ("POST", "/api/check-domain", {"domain": "www.attacker.com"}),
+    ]
+    for method, path, body in routes:
+        call = (lambda _: client.get(path)) if method == "GET" else (lambda _: client.post(path, json=body))
+        rate = throughput(call, [None] * 50, 1.0)
+        print(f"{method:>6} {path:<24} {rate:>10,.0f} req/sec")
+
+
+BENCHMARKS = {
+    "blocklist": bench_blocklist,
+    "nmcli": bench_nmcli,
+    "netsh": bench_netsh,
+    "scoring": bench_scoring,
+    "eviltwin": bench_eviltwin,
+    "lookalike": bench_lookalike,
+    "channels": bench_channels,
+    "history": bench_history,
+    "http": bench_http,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (choose from {', '.join(BENCHMARKS)})")
+            return 1
+        BENCHMARKS[name]()
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
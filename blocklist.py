@@ -0,0 +1,59 @@
+"""
+Blocklist format - Domain normalization and the compiled blocklist file shared by
+app.py and compile_blocklist.py
+
+Kept free of app.py's import-time setup so the compiler runs even when
+BLOCKLIST_FILE points at a file that does not exist yet.
+"""
+
+import hashlib
+import os
+import sys
+from array import array
+from urllib.parse import urlsplit
+
+
+def normalize_domain(domain):
+    """Reduce user input (URL, host:port, trailing dot) to a lowercase hostname"""
+    domain = domain.strip().lower()
+    if '://' in domain:
+        domain = urlsplit(domain).hostname or ''
+    else:
+        domain = domain.split('/', 1)[0].rsplit('@', 1)[-1]
+        if domain.count(':') == 1:
+            domain = domain.split(':', 1)[0]
+    return domain.rstrip('.')
+
+# Entries found in the header of most hosts files that must never be blocked
+HOSTS_FILE_RESERVED = {'localhost', 'localhost.localdomain', 'local', 'broadcasthost', '0.0.0.0', 'ip6-localhost', 'ip6-loopback'}
+
+def parse_blocklist_lines(lines):
+    """Yield domains from plain-text or hosts-file style lines, skipping comments"""
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        # hosts format: "0.0.0.0 domain" -> take the hostname
+        domain = normalize_domain(line.split()[-1])
+        if domain and domain not in HOSTS_FILE_RESERVED:
+            yield domain
+
+def domain_hash(domain):
+    """64-bit hash of a normalized domain, as stored in compiled blocklists"""
+    return int.from_bytes(hashlib.blake2b(domain.encode('utf-8'), digest_size=8).digest(), 'little')
+
+BLOCKLIST_MAGIC = b'WSABL1\x00\x00'
+
+def compile_blocklist(domains, path):
+    """Write domains as a sorted array of 64-bit hashes that workers can mmap"""
+    hashes = array('Q', sorted({domain_hash(normalize_domain(d)) for d in domains if normalize_domain(d)}))
+    if sys.byteorder != 'little':
+        hashes.byteswap()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(BLOCKLIST_MAGIC)
+        f.write(len(hashes).to_bytes(8, 'little'))
+        hashes.tofile(f)
+    # Atomic replace so running workers never see a half-written file
+    os.replace(tmp_path, path)
+    return len(hashes)
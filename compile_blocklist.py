@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Blocklist Compiler - Builds the compact, mmap-able blocklist used by app.py
+
+app.py always adds its built-in MALICIOUS_DOMAINS on top of the compiled file.
+
+Usage:
+    python compile_blocklist.py domains.txt blocklist.bin
+    BLOCKLIST_FILE=blocklist.bin gunicorn app:app
+"""
+
+import sys
+import time
+
+# Not app: importing it would open BLOCKLIST_FILE, which this script may be about to create
+from blocklist import compile_blocklist, parse_blocklist_lines
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python compile_blocklist.py <domains.txt|-> <output.bin>")
+        print("Input is one domain per line (hosts-file lines are accepted)")
+        return 1
+
+    source, output = sys.argv[1], sys.argv[2]
+    start = time.perf_counter()
+
+    if source == '-':
+        domains = list(parse_blocklist_lines(sys.stdin))
+    else:
+        with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+            domains = list(parse_blocklist_lines(f))
+
+    count = compile_blocklist(domains, output)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Compiled {count} domains into {output} in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+nl80211 Netlink Client - Reads WiFi link and scan results straight from the kernel
+
+Talks generic netlink to the nl80211 family, so no nmcli/NetworkManager
+process is needed. Responses can be recorded to and replayed from fixture
+files (one binary file per command and interface, see recording_name) for
+testing without WiFi hardware.
+"""
+
+import os
+import socket
+import struct
+
+# Netlink / generic netlink constants
+NETLINK_GENERIC = 16
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x01
+NLM_F_ACK = 0x04
+NLM_F_DUMP = 0x300
+GENL_ID_CTRL = 0x10
+CTRL_CMD_GETFAMILY = 3
+CTRL_ATTR_FAMILY_ID = 1
+CTRL_ATTR_FAMILY_NAME = 2
+
+# nl80211 commands and attributes (include/uapi/linux/nl80211.h)
+NL80211_CMD_GET_INTERFACE = 5
+NL80211_CMD_GET_SCAN = 32
+NL80211_CMD_TRIGGER_SCAN = 33
+NL80211_ATTR_IFINDEX = 3
+NL80211_ATTR_IFNAME = 4
+NL80211_ATTR_IFTYPE = 5
+NL80211_ATTR_BSS = 47
+NL80211_IFTYPE_STATION = 2
+NL80211_BSS_BSSID = 1
+NL80211_BSS_FREQUENCY = 2
+NL80211_BSS_CAPABILITY = 5
+NL80211_BSS_INFORMATION_ELEMENTS = 6
+NL80211_BSS_SIGNAL_MBM = 7
+NL80211_BSS_STATUS = 9
+NL80211_BSS_STATUS_ASSOCIATED = 1
+
+COMMAND_NAMES = {
+    CTRL_CMD_GETFAMILY: "get_family",
+    NL80211_CMD_GET_INTERFACE: "get_interface",
+    NL80211_CMD_GET_SCAN: "get_scan",
+    NL80211_CMD_TRIGGER_SCAN: "trigger_scan",
+}
+
+
+class NetlinkError(Exception):
+    """Raised when the kernel answers a request with an error"""
+
+
+def pack_attr(attr_type, value):
+    """Encode one netlink attribute, padded to 4 bytes"""
+    length = 4 + len(value)
+    return struct.pack('HH', length, attr_type) + value + b'\x00' * ((4 - length % 4) % 4)
+
+
+def parse_attrs(data):
+    """Decode a run of netlink attributes into {type: bytes}"""
+    attrs = {}
+    offset = 0
+    while offset + 4 <= len(data):
+        length, attr_type = struct.unpack_from('HH', data, offset)
+        if length < 4:
+            break
+        # Strip NLA_F_NESTED / NLA_F_NET_BYTEORDER flags
+        attrs[attr_type & 0x3FFF] = data[offset + 4:offset + length]
+        offset += (length + 3) & ~3
+    return attrs
+
+
+def parse_messages(data):
+    """Yield (type, flags, payload) for each netlink message in a response buffer"""
+    offset = 0
+    while offset + 16 <= len(data):
+        length, msg_type, flags, _, _ = struct.unpack_from('IHHII', data, offset)
+        if length < 16:
+            break
+        payload = data[offset + 16:offset + length]
+        if msg_type == NLMSG_ERROR:
+            errno = struct.unpack_from('i', payload)[0] if len(payload) >= 4 else 0
+            if errno:
+                raise NetlinkError(f"netlink error {-errno}: {os.strerror(-errno)}")
+        elif msg_type != NLMSG_DONE:
+            yield msg_type, flags, payload
+        offset += (length + 3) & ~3
+
+
+def recording_name(family, cmd, attrs=b''):
+    """Fixture file name for a request: the command, plus the interface it targets
+
+    Per-interface commands (get_scan, trigger_scan) are keyed by ifindex so a
+    multi-radio host records one dump per radio instead of overwriting them.
+    """
+    name = COMMAND_NAMES.get(cmd, str(cmd))
+    if family != GENL_ID_CTRL:
+        ifindex = parse_attrs(attrs).get(NL80211_ATTR_IFINDEX)
+        if ifindex is not None:
+            name += f"-{struct.unpack('I', ifindex[:4])[0]}"
+    return name + '.bin'
+
+
+class SocketTransport:
+    """Sends generic netlink requests over an AF_NETLINK socket"""
+
+    def __init__(self, timeout=2.0, record_dir=None):
+        self.timeout = timeout
+        self.record_dir = record_dir
+        self._seq = 0
+
+    def exchange(self, family, cmd, attrs=b'', flags=NLM_F_REQUEST):
+        """Send one request and return every response datagram concatenated"""
+        self._seq += 1
+        body = struct.pack('BBH', cmd, 1, 0) + attrs
+        request = struct.pack('IHHII', 16 + len(body), family, flags, self._seq, 0) + body
+
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+        try:
+            sock.settimeout(self.timeout)
+            sock.bind((0, 0))
+            sock.send(request)
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                chunks.append(chunk)
+                if self._finished(chunk, flags):
+                    break
+        finally:
+            sock.close()
+
+        data = b''.join(chunks)
+        if self.record_dir:
+            os.makedirs(self.record_dir, exist_ok=True)
+            with open(os.path.join(self.record_dir, recording_name(family, cmd, attrs)), 'wb') as f:
+                f.write(data)
+        return data
+
+    @staticmethod
+    def _finished(chunk, flags):
+        # Dumps end with NLMSG_DONE; plain requests end after one reply (or the ack)
+        offset = 0
+        while offset + 16 <= len(chunk):
+            length, msg_type = struct.unpack_from('IH', chunk, offset)
+            if msg_type in (NLMSG_DONE, NLMSG_ERROR) or not flags & NLM_F_DUMP:
+                return True
+            if length < 16:
+                return True
+            offset += (length + 3) & ~3
+        return False
+
+
+class RecordedTransport:
+    """Replays responses captured by SocketTransport(record_dir=...)"""
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+
+    def exchange(self, family, cmd, attrs=b'', flags=NLM_F_REQUEST):
+        path = os.path.join(self.fixture_dir, recording_name(family, cmd, attrs))
+        if not os.path.exists(path):
+            # Commands without a recording (e.g. trigger_scan) just succeed
+            return b''
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def frequency_to_channel(freq):
+    """Map a centre frequency in MHz to its WiFi channel number"""
+    if freq == 2484:
+        return 14
+    if 2412 <= freq < 2484:
+        return (freq - 2407) // 5
+    if 5950 < freq <= 7125:
+        return (freq - 5950) // 5
+    if 5000 <= freq <= 5950:
+        return (freq - 5000) // 5
+    return None
+
+
+def parse_security(ies, capability):
+    """Derive (security label, auth description) from information elements"""
+    rsn_akms = set()
+    wpa1 = False
+    offset = 0
+    while offset + 2 <= len(ies):
+        element_id, length = ies[offset], ies[offset + 1]
+        body = ies[offset + 2:offset + 2 + length]
+        if element_id == 48 and len(body) >= 8:
+            # RSN: version, group cipher, pairwise suites, then AKM suites
+            pairwise = struct.unpack_from('<H', body, 6)[0]
+            akm_offset = 8 + 4 * pairwise
+            if akm_offset + 2 <= len(body):
+                count = struct.unpack_from('<H', body, akm_offset)[0]
+                for i in range(count):
+                    start = akm_offset + 2 + 4 * i
+                    suite = body[start:start + 4]
+                    if len(suite) == 4 and suite[:3] == b'\x00\x0f\xac':
+                        rsn_akms.add(suite[3])
+            else:
+                rsn_akms.add(2)
+        elif element_id == 221 and body[:4] == b'\x00\x50\xf2\x01':
+            wpa1 = True
+        offset += 2 + length
+
+    # AKM 8/24 = SAE (WPA3-Personal), 2/6 = PSK, 1/5 = 802.1X
+    if rsn_akms & {8, 9, 24, 25}:
+        return "WPA3", "WPA3-Personal" if rsn_akms & {8, 24} else "WPA3"
+    if rsn_akms:
+        return "WPA2", "WPA2-Enterprise" if rsn_akms & {1, 5} else "WPA2-Personal"
+    if wpa1:
+        return "WPA", "WPA-Personal"
+    if capability & 0x0010:
+        # Privacy bit without RSN/WPA elements means WEP
+        return "WEP", "WEP"
+    return "Open", "Open"
+
+
+def parse_bss(bss_attrs):
+    """Turn one nested NL80211_ATTR_BSS into a network dict"""
+    attrs = parse_attrs(bss_attrs)
+    ies = attrs.get(NL80211_BSS_INFORMATION_ELEMENTS, b'')
+    ssid = ""
+    offset = 0
+    while offset + 2 <= len(ies):
+        if ies[offset] == 0:
+            ssid = ies[offset + 2:offset + 2 + ies[offset + 1]].decode('utf-8', 'replace')
+            break
+        offset += 2 + ies[offset + 1]
+
+    bssid = attrs.get(NL80211_BSS_BSSID, b'')
+    freq = struct.unpack('I', attrs[NL80211_BSS_FREQUENCY])[0] if NL80211_BSS_FREQUENCY in attrs else None
+    capability = struct.unpack('H', attrs[NL80211_BSS_CAPABILITY][:2])[0] if NL80211_BSS_CAPABILITY in attrs else 0
+    signal = 0
+    if NL80211_BSS_SIGNAL_MBM in attrs:
+        # mBm -> dBm -> 0-100 quality, the same scale nmcli reports
+        dbm = struct.unpack('i', attrs[NL80211_BSS_SIGNAL_MBM])[0] / 100
+        signal = int(max(0, min(100, 2 * (dbm + 100))))
+    status = struct.unpack('I', attrs[NL80211_BSS_STATUS])[0] if NL80211_BSS_STATUS in attrs else None
+    security, auth = parse_security(ies, capability)
+
+    return {
+        "name": ssid or "Unknown",
+        "status": "Available",
+        "security": security,
+        "auth": auth,
+        "bssid": ':'.join(f'{b:02x}' for b in bssid),
+        "channel": frequency_to_channel(freq) if freq else None,
+        "frequency": freq,
+        "rate": None,
+        "signal": signal,
+        "active": status == NL80211_BSS_STATUS_ASSOCIATED
+    }
+
+
+class NL80211Client:
+    """Reads interfaces and scan results from the nl80211 generic netlink family"""
+
+    def __init__(self, transport=None, trigger_scan=False):
+        self.transport = transport or SocketTransport()
+        self.trigger = trigger_scan
+        self._family = None
+
+    def family_id(self):
+        if self._family is None:
+            data = self.transport.exchange(
+                GENL_ID_CTRL, CTRL_CMD_GETFAMILY, pack_attr(CTRL_ATTR_FAMILY_NAME, b'nl80211\x00'))
+            for _, _, payload in parse_messages(data):
+                attrs = parse_attrs(payload[4:])
+                if CTRL_ATTR_FAMILY_ID in attrs:
+                    self._family = struct.unpack('H', attrs[CTRL_ATTR_FAMILY_ID][:2])[0]
+                    break
+            else:
+                raise NetlinkError("nl80211 family not available")
+        return self._family
+
+    def interfaces(self):
+        """Return [(ifindex, ifname)] for station-mode wireless interfaces"""
+        data = self.transport.exchange(self.family_id(), NL80211_CMD_GET_INTERFACE,
+                                       flags=NLM_F_REQUEST | NLM_F_DUMP)
+        result = []
+        for _, _, payload in parse_messages(data):
+            attrs = parse_attrs(payload[4:])
+            if NL80211_ATTR_IFINDEX not in attrs:
+                continue
+            iftype = struct.unpack('I', attrs[NL80211_ATTR_IFTYPE])[0] if NL80211_ATTR_IFTYPE in attrs else None
+            if iftype not in (None, NL80211_IFTYPE_STATION):
+                continue
+            name = attrs.get(NL80211_ATTR_IFNAME, b'').rstrip(b'\x00').decode('utf-8', 'replace')
+            result.append((struct.unpack('I', attrs[NL80211_ATTR_IFINDEX])[0], name))
+        return result
+
+    def scan(self, ifindex):
+        """Return the kernel's current scan results for one interface"""
+        index_attr = pack_attr(NL80211_ATTR_IFINDEX, struct.pack('I', ifindex))
+        if self.trigger:
+            try:
+                # Ask for a fresh scan; results show up in a later dump
+                self.transport.exchange(self.family_id(), NL80211_CMD_TRIGGER_SCAN, index_attr,
+                                        flags=NLM_F_REQUEST | NLM_F_ACK)
+            except (NetlinkError, OSError):
+                # EBUSY while a scan runs, EPERM without CAP_NET_ADMIN
+                pass
+        data = self.transport.exchange(self.family_id(), NL80211_CMD_GET_SCAN, index_attr,
+                                       flags=NLM_F_REQUEST | NLM_F_DUMP)
+        networks = []
+        for _, _, payload in parse_messages(data):
+            attrs = parse_attrs(payload[4:])
+            if NL80211_ATTR_BSS in attrs:
+                network = parse_bss(attrs[NL80211_ATTR_BSS])
+                network["interface"] = ifindex
+                networks.append(network)
+        return networks
+
+    def scan_all(self):
+        """Scan results from every station interface"""
+        networks = []
+        for ifindex, _ in self.interfaces():
+            networks.extend(self.scan(ifindex))
+        return networks
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Tests never touch real WiFi hardware or write a history database
+os.environ.setdefault('PROBE_BACKEND', 'replay')
+os.environ.setdefault('HISTORY_DB', '')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
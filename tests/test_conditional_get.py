@@ -0,0 +1,52 @@
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, "nearby_tracker", app.NearbyNetworkTracker())
+    monkeypatch.setattr(app, "conditional_get", app.ConditionalGet())
+    return app.app.test_client()
+
+
+def test_poll_with_matching_etag_gets_304(client):
+    first = client.get("/api/networks-nearby")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.get_json()["networks"]
+
+    second = client.get("/api/networks-nearby", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == etag
+    assert app.conditional_get.get_stats()["not_modified"] == 1
+
+
+def test_polls_within_scan_interval_reuse_the_scan(client, monkeypatch):
+    scans = []
+    scan = app.WiFiSecurityAnalyzer.get_nearby_networks
+    monkeypatch.setattr(app.WiFiSecurityAnalyzer, "get_nearby_networks",
+                        lambda self: scans.append(1) or scan(self))
+    etag = client.get("/api/networks-nearby").headers["ETag"]
+    for _ in range(3):
+        assert client.get("/api/networks-nearby", headers={"If-None-Match": etag}).status_code == 304
+    assert len(scans) == 1
+
+
+def test_etag_follows_tracker_seq(client):
+    etag = client.get("/api/networks-nearby").headers["ETag"]
+    seq, networks = app.nearby_tracker.snapshot()
+    app.nearby_tracker.update([dict(networks[0], signal=(networks[0]["signal"] + 10) % 100)] + networks[1:])
+    changed = client.get("/api/networks-nearby", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_stale_or_missing_etag_gets_the_payload(client):
+    client.get("/api/networks-nearby")
+    response = client.get("/api/networks-nearby", headers={"If-None-Match": 'W/"stale"'})
+    assert response.status_code == 200
+    assert response.get_json()["networks"]
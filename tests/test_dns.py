@@ -0,0 +1,38 @@
+import struct
+
+import app
+
+QUESTION = b'\x07example\x03com\x00' + struct.pack('!HH', 1, 1)
+
+
+def response(answers, flags=0x8180, question=QUESTION):
+    header = struct.pack('!HHHHHH', 0x1234, flags, 1, len(answers), 0, 0)
+    return header + question + b''.join(answers)
+
+
+def answer(rtype, rdata, name=b'\xc0\x0c'):
+    return name + struct.pack('!HHIH', rtype, 1, 300, len(rdata)) + rdata
+
+
+def test_first_a_record():
+    data = response([answer(1, bytes([93, 184, 216, 34])), answer(1, bytes([10, 0, 0, 1]))])
+    assert app.AsyncResolver.parse_response(data) == "93.184.216.34"
+
+
+def test_cname_before_a_record_is_skipped():
+    cname = answer(5, b'\x03www\xc0\x0c')
+    # The A record's owner is an uncompressed name, as some servers send it
+    a = answer(1, bytes([192, 0, 2, 7]), name=b'\x03www\x07example\x03com\x00')
+    assert app.AsyncResolver.parse_response(response([cname, a])) == "192.0.2.7"
+
+
+def test_nxdomain_and_empty_answers():
+    assert app.AsyncResolver.parse_response(response([], flags=0x8183)) is None
+    assert app.AsyncResolver.parse_response(response([])) is None
+    assert app.AsyncResolver.parse_response(response([answer(28, bytes(16))])) is None
+
+
+def test_truncated_packets():
+    data = response([answer(1, bytes([93, 184, 216, 34]))])
+    for end in (0, 5, 12, 20, len(data) - 8):
+        assert app.AsyncResolver.parse_response(data[:end]) is None
@@ -0,0 +1,54 @@
+import json
+
+import app
+from test_nearby_tracker import apply, net
+
+
+def decode(message):
+    lines = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return lines["event"], int(lines["id"]), json.loads(lines["data"])
+
+
+def test_late_subscriber_gets_deltas_from_its_own_seq(monkeypatch):
+    tracker = app.NearbyNetworkTracker()
+    monkeypatch.setattr(app, "nearby_tracker", tracker)
+    broadcaster = app.EventBroadcaster()
+    tracker.update([net("n0")])
+    # An early subscriber is at seq 1; a REST poll then moves the tracker on
+    early_message, early_seq = broadcaster.networks_event(None)
+    tracker.update([net("n0"), net("n1")])
+    late_message, late_seq = broadcaster.networks_event(None)
+    early = apply({}, decode(early_message)[2])
+    late = apply({}, decode(late_message)[2])
+
+    tracker.update([net("n0")])
+    current = {app.network_key(n): n for n in tracker.snapshot()[1]}
+    for state, seq in ((early, early_seq), (late, late_seq)):
+        message, new_seq = broadcaster.networks_event(seq)
+        event, event_id, delta = decode(message)
+        assert (event, event_id, new_seq) == ("networks", tracker.seq, tracker.seq)
+        assert delta["since"] == seq
+        assert apply(state, delta) == current
+
+
+def test_current_subscriber_gets_nothing(monkeypatch):
+    tracker = app.NearbyNetworkTracker()
+    monkeypatch.setattr(app, "nearby_tracker", tracker)
+    seq = tracker.update([net("n0")])
+    assert app.EventBroadcaster().networks_event(seq) == (None, seq)
+
+
+def test_producer_signals_changes_once(monkeypatch):
+    tracker = app.NearbyNetworkTracker()
+    monkeypatch.setattr(app, "nearby_tracker", tracker)
+    monkeypatch.setattr(app, "current_analysis", lambda: ({}, 503))
+    monkeypatch.setattr(tracker, "refresh", lambda analyzer, max_age: True)
+    broadcaster = app.EventBroadcaster()
+    # Registered directly, so no producer thread starts
+    subscriber = app.queue.Queue()
+    broadcaster._subscribers.add(subscriber)
+    tracker.update([net("n0")])
+    broadcaster.produce()
+    broadcaster.produce()
+    assert subscriber.get_nowait() is app.EventBroadcaster.NETWORKS
+    assert subscriber.empty()
@@ -0,0 +1,41 @@
+import pytest
+
+import app
+
+
+def ap(bssid, auth, channel=6, signal=60, name="CafeNet"):
+    return {"name": name, "bssid": bssid, "auth": auth, "security": auth, "channel": channel, "signal": signal}
+
+
+def finding(networks):
+    detector = app.EvilTwinDetector()
+    detector.update(networks)
+    return detector, detector.findings()[0] if detector.findings() else None
+
+
+@pytest.mark.parametrize("weak", ["Open", "WEP"])
+def test_open_or_wep_next_to_wpa_is_a_downgrade(weak):
+    detector, result = finding([ap("a4:2b:b0:00:00:01", "WPA2"), ap("a4:2b:b0:00:00:02", weak)])
+    assert result["flags"] == ["security_downgrade"]
+    assert result["suspicious"] is True
+    assert detector.attacks_for("cafenet") == ["Possible Evil Twin: " + result["reasons"][0]]
+
+
+def test_wpa2_and_wpa3_are_compatible():
+    _, result = finding([ap("a4:2b:b0:00:00:01", "WPA2"), ap("a4:2b:b0:00:00:02", "WPA3")])
+    assert result is None
+
+
+def test_vendor_or_channel_mismatch_alone_is_not_suspicious():
+    detector, result = finding([ap("a4:2b:b0:00:00:01", "WPA2", channel=1),
+                                ap("00:1a:2b:00:00:02", "WPA3", channel=36)])
+    assert result["flags"] == ["vendor_mismatch", "channel_mismatch"]
+    assert result["suspicious"] is False
+    assert detector.findings(suspicious_only=True) == []
+    assert detector.attacks_for("CafeNet") == []
+
+
+def test_hidden_networks_are_not_grouped():
+    _, result = finding([ap("a4:2b:b0:00:00:01", "WPA2", name="Unknown"),
+                         ap("a4:2b:b0:00:00:02", "Open", name="Unknown")])
+    assert result is None
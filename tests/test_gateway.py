@@ -0,0 +1,30 @@
+import os
+
+import app
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'fixtures', 'probes', 'linux', 'proc_net_route.txt')
+HEADER = "Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\t\tMTU\tWindow\tIRTT\n"
+
+
+def test_default_route_from_fixture():
+    with open(FIXTURE, encoding='utf-8') as f:
+        assert app.parse_proc_route(f.read()) == "192.168.1.1"
+
+
+def test_route_without_gateway_flag_is_ignored():
+    data = HEADER + ("wlan0\t00000000\t0101A8C0\t0001\t0\t0\t600\t00000000\t0\t0\t0\n"
+                     "eth0\t00000000\tFE00000A\t0003\t0\t0\t100\t00000000\t0\t0\t0\n")
+    assert app.parse_proc_route(data) == "10.0.0.254"
+
+
+def test_no_default_route():
+    data = HEADER + "wlan0\t0001A8C0\t00000000\t0001\t0\t0\t600\t00FFFFFF\t0\t0\t0\n"
+    assert app.parse_proc_route(data) is None
+    assert app.parse_proc_route(HEADER) is None
+    assert app.parse_proc_route("") is None
+
+
+def test_short_lines_are_skipped():
+    data = HEADER + "wlan0\t00000000\n" + "wlan0\t00000000\t0101A8C0\t0003\t0\t0\t600\t00000000\t0\t0\t0\n"
+    assert app.parse_proc_route(data) == "192.168.1.1"
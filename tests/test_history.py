@@ -0,0 +1,61 @@
+import queue
+import time
+
+import app
+
+
+def test_rows_are_written_and_queried(tmp_path):
+    now = time.time()
+    store = app.HistoryStore(path=str(tmp_path / "history.db"), flush_interval=0.01)
+    store.record_scan([{"name": "Home", "bssid": "aa:bb:cc:dd:ee:01", "channel": 6, "signal": -50,
+                        "security": "WPA2"},
+                       {"name": "Cafe", "bssid": "aa:bb:cc:dd:ee:02", "channel": 11, "signal": -70,
+                        "security": "Open"}], when=now)
+    store.record_domain_checks([{"domain": "example.com", "safe": True}], when=now + 1)
+    wait_for_writes(store, 3)
+    
+    rows = store.query("scans", key="aa:bb:cc:dd:ee:02")
+    assert [(r["ssid"], r["signal"]) for r in rows] == [("Cafe", -70)]
+    assert [r["safe"] for r in store.query("domain_checks")] == [True]
+    assert len(store.query("scans", since=now - 1, until=now + 0.5)) == 2
+    assert store.query("scans", since=now + 0.5) == []
+
+
+def test_identical_analyses_are_stored_once(tmp_path):
+    store = app.HistoryStore(path=str(tmp_path / "history.db"), flush_interval=0.01)
+    result = {"threat_level": "LOW", "threat_score": 1, "network_info": {"ssid": "Home"}, "scan": 1}
+    store.record_analysis(result)
+    store.record_analysis(dict(result, scan=2))
+    store.record_analysis(dict(result, threat_score=5))
+    wait_for_writes(store, 2)
+    assert [r["result"]["threat_score"] for r in store.query("analyses")] == [5, 1]
+
+
+def test_prune_drops_rows_past_retention(tmp_path):
+    store = app.HistoryStore(path=str(tmp_path / "history.db"), retention_days=1, flush_interval=0.01)
+    store.record_device("laptop", when=time.time() - 2 * 86400)
+    store.record_device("phone")
+    wait_for_writes(store, 2)
+    connection = store.connect()
+    store.prune(connection)
+    connection.close()
+    assert [r["device"] for r in store.query("device_logs")] == ["phone"]
+    assert store.get_stats()["pruned"] == 1
+
+
+def test_disabled_and_full_queue(tmp_path):
+    assert app.HistoryStore(path='').record("device_logs", [(time.time(), "laptop", None)]) is False
+    store = app.HistoryStore(path=str(tmp_path / "history.db"))
+    store.start()
+    # A full queue the writer thread does not read
+    store._queue = queue.Queue(maxsize=1)
+    store._queue.put(("device_logs", [(time.time(), "first", None)]))
+    assert store.record("device_logs", [(time.time(), "second", None)]) is False
+    assert store.get_stats()["dropped"] == 1
+
+
+def wait_for_writes(store, rows, timeout=5):
+    deadline = time.monotonic() + timeout
+    while store.get_stats()["written"] < rows:
+        assert time.monotonic() < deadline, store.get_stats()
+        time.sleep(0.01)
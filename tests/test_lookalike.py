@@ -0,0 +1,59 @@
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize("domain", ["officer.com", "apples.com", "chased.com", "login.officer.com"])
+def test_added_letter_on_short_name_is_not_a_lookalike(domain):
+    assert app.domain_lookalikes.match(domain) is None
+    assert app.WiFiSecurityAnalyzer().check_domain_blocklist(domain) is None
+
+
+@pytest.mark.parametrize("domain, protected", [
+    ("paypa1.com", "paypal.com"),
+    ("g00gle.com", "google.com"),
+    ("rnicrosoft.com", "microsoft.com"),
+    ("аpple.com", "apple.com"),
+    ("amazom.com", "amazon.com"),
+    ("micorsoft.com", "microsoft.com"),
+    ("login.paypa1.com.evil.net", "paypal.com"),
+    ("gooogle.com", "google.com"),
+    ("paypall.com", "paypal.com"),
+    ("netflx.com", "netflix.com"),
+    ("amazn.com", "amazon.com"),
+])
+def test_homoglyph_substitution_and_swap_are_flagged(domain, protected):
+    verdict = app.WiFiSecurityAnalyzer().check_domain_blocklist(domain)
+    assert verdict["safe"] is False
+    assert verdict["lookalike_of"] == protected
+
+
+@pytest.mark.parametrize("domain, protected", [
+    ("paypal.net", "paypal.com"),
+    ("paypal.com.evil.net", "paypal.com"),
+    ("login.paypal.com.attacker.io", "paypal.com"),
+])
+def test_protected_label_on_another_domain_is_flagged(domain, protected):
+    assert app.domain_lookalikes.match(domain) == {"lookalike_of": protected, "distance": 0}
+
+
+def test_protected_domain_and_subdomains_are_not_flagged():
+    assert app.domain_lookalikes.match("paypal.com") is None
+    assert app.domain_lookalikes.match("www.paypal.com") is None
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("office", "office", 0),
+    ("office", "offlce", 1),
+    ("office", "ofifce", 1),
+    ("officer", "office", 2),
+    ("apple", "appl", 2),
+    ("gooogle", "google", 1),
+    ("paypl", "paypal", 1),
+    ("netflx", "netflix", 1),
+    ("netflixs", "netflix", 1),
+    ("googlex", "google", 2),
+    ("office", "eciffo", 2),
+])
+def test_lookalike_distance(a, b, distance):
+    assert app.lookalike_distance(a, b) == distance
@@ -0,0 +1,138 @@
+import random
+import threading
+import time
+
+import app
+
+
+def net(name, signal=50):
+    return {"name": name, "bssid": "02:00:00:00:00:" + name[-2:], "signal": signal}
+
+
+def apply(state, delta):
+    """Client side of /api/networks-nearby/changes"""
+    if delta["reset"]:
+        return {app.network_key(n): n for n in delta["networks"]}
+    state = dict(state)
+    for key in delta["removed"]:
+        state.pop(tuple(key), None)
+    for network in delta["added"] + delta["changed"]:
+        state[app.network_key(network)] = network
+    return state
+
+
+def test_remove_readd_remove_is_reported_as_removed():
+    tracker = app.NearbyNetworkTracker()
+    tracker.update([net("n0")])
+    seq = tracker.update([net("n0"), net("n1")])
+    tracker.update([net("n0")])
+    tracker.update([net("n0"), net("n1")])
+    tracker.update([net("n0")])
+    delta = tracker.changes_since(seq)
+    assert delta["removed"] == [["n1", "02:00:00:00:00:n1"]]
+    assert delta["added"] == [] and delta["changed"] == []
+
+
+def test_added_then_removed_after_since_is_not_reported():
+    tracker = app.NearbyNetworkTracker()
+    seq = tracker.update([net("n0")])
+    tracker.update([net("n0"), net("n1")])
+    tracker.update([net("n0")])
+    delta = tracker.changes_since(seq)
+    assert (delta["added"], delta["removed"], delta["changed"]) == ([], [], [])
+
+
+def test_removed_then_readded_is_reported_as_changed():
+    tracker = app.NearbyNetworkTracker()
+    seq = tracker.update([net("n0"), net("n1", 40)])
+    tracker.update([net("n0")])
+    tracker.update([net("n0"), net("n1", 70)])
+    delta = tracker.changes_since(seq)
+    assert delta["changed"] == [net("n1", 70)]
+    assert delta["added"] == [] and delta["removed"] == []
+
+
+def test_deltas_from_any_seq_reproduce_the_current_scan():
+    rng = random.Random(7)
+    tracker = app.NearbyNetworkTracker()
+    snapshots = {}
+    for _ in range(60):
+        scan = [net(f"n{i}", rng.choice((30, 60))) for i in range(6) if rng.random() < 0.5]
+        seq = tracker.update(scan)
+        snapshots[seq] = {app.network_key(n): n for n in scan}
+    current = {app.network_key(n): n for n in tracker.snapshot()[1]}
+    for since, state in snapshots.items():
+        assert apply(state, tracker.changes_since(since)) == current
+
+
+class Scanner:
+    """Stand-in analyzer returning queued scans; optionally blocks until released"""
+
+    def __init__(self, *scans, gate=None):
+        self.scans = list(scans)
+        self.gate = gate
+        self.calls = 0
+
+    def get_nearby_networks(self):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait()
+        return self.scans.pop(0)
+
+
+def test_every_scan_is_sampled_once(monkeypatch):
+    history = app.SignalHistory(size=8)
+    monkeypatch.setattr(app, "signal_history", history)
+    tracker = app.NearbyNetworkTracker()
+    scan = [net("n0", 40), net("n1", 60)]
+    # A stable environment is still one sample per scan
+    scanner = Scanner(scan, [dict(n) for n in scan], [net("n0", 45), net("n1", 60)])
+    for _ in range(3):
+        tracker.refresh(scanner, 0)
+    assert tracker.seq == 2
+    assert history.get_stats()["scans"] == tracker.scans == 3
+    assert [history.summary(net(n)["bssid"])["samples"] for n in ("n0", "n1")] == [3, 3]
+
+    # Polls within max_age reuse the scan without sampling it again
+    assert tracker.refresh(scanner, 60)
+    assert scanner.calls == 3
+    assert history.get_stats()["scans"] == 3
+
+
+def test_coalesced_callers_share_one_sample(monkeypatch):
+    history = app.SignalHistory(size=8)
+    monkeypatch.setattr(app, "signal_history", history)
+    monkeypatch.setattr(app, "single_flight", app.SingleFlight())
+    tracker = app.NearbyNetworkTracker()
+    gate = threading.Event()
+    scanner = Scanner([net("n0", 40)], gate=gate)
+    threads = [threading.Thread(target=tracker.refresh, args=(scanner, 0)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while app.single_flight.get_stats()["calls"] < 4:
+        time.sleep(0.001)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert scanner.calls == 1
+    assert history.summary(net("n0")["bssid"])["samples"] == 1
+
+
+def test_rssi_jump_survives_repeated_polls(monkeypatch):
+    detector = app.EvilTwinDetector(rssi_jump=30)
+    monkeypatch.setattr(app, "evil_twin_detector", detector)
+    tracker = app.NearbyNetworkTracker()
+    scanner = Scanner([net("n0", 40)], [net("n0", 80)], [net("n0", 80)])
+    tracker.refresh(scanner, 0)
+    tracker.refresh(scanner, 0)
+    generation = detector.generation
+    assert detector.findings()[0]["flags"] == ["rssi_jump"]
+    # Polls of the same scan must not compare it with itself and clear the jump
+    tracker.refresh(scanner, 60)
+    tracker.refresh(scanner, 60)
+    assert detector.findings()[0]["flags"] == ["rssi_jump"]
+    assert detector.generation == generation
+    assert detector.get_stats()["scans"] == 2
+    # The next scan compares against the one before it, so a steady signal clears the jump
+    tracker.refresh(scanner, 0)
+    assert detector.findings() == []
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+import app
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'fixtures', 'probes', 'windows', 'netsh_networks.txt')
+
+
+@pytest.fixture
+def dump():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def single_pass(monkeypatch):
+    """Fail the test if parse_netsh_networks() falls back to the field-by-field parser"""
+    def fallback(output):
+        raise AssertionError("fell back to parse_netsh_blocks")
+    monkeypatch.setattr(app, 'parse_netsh_blocks', fallback)
+
+
+def test_one_entry_per_bssid(dump, single_pass):
+    networks = app.parse_netsh_networks(dump)
+    assert [n["bssid"] for n in networks if n["name"] == "HomeNetwork"] == ["a4:2b:b0:c1:7e:10", "a4:2b:b0:c1:7e:11"]
+    home = networks[1]
+    assert (home["signal"], home["radio_type"], home["band"], home["channel"]) == (74, "802.11ax", "5 GHz", 36)
+    assert (home["auth"], home["encryption"], home["security"]) == ("WPA2-Personal", "CCMP", "CCMP")
+
+
+def test_open_network_security_falls_back_to_auth(dump, single_pass):
+    coffee, = [n for n in app.parse_netsh_networks(dump) if n["name"] == "Coffee Shop Free WiFi"]
+    assert coffee["security"] == "None"
+    assert coffee["auth"] == "Open"
+
+
+def test_ssid_without_bssid_lines(dump, single_pass):
+    guest, = [n for n in app.parse_netsh_networks(dump) if n["name"] == "Neighbor-Guest"]
+    assert guest["bssid"] is None
+    assert guest["auth"] == "WPA2-Personal"
+    assert "signal" not in guest
+
+
+def test_hidden_ssid_without_band(dump, single_pass):
+    hidden = app.parse_netsh_networks(dump)[-1]
+    assert hidden["name"] == "Unknown"
+    assert hidden["bssid"] == "3c:84:6a:0b:1c:2d"
+    assert (hidden["signal"], hidden["band"], hidden["channel"]) == (33, None, 1)
+
+
+def test_bssid_lines_are_not_read_as_ssids(dump, single_pass):
+    names = [n["name"] for n in app.parse_netsh_networks(dump)]
+    assert len(names) == 7
+    assert not any(name.count(':') == 5 for name in names)
+
+
+def test_fallback_matches_single_pass(dump):
+    assert app.parse_netsh_blocks(dump) == app.parse_netsh_networks(dump)
+
+
+def test_unexpected_layout_uses_fallback(dump):
+    # A driver that prints an extra line before Signal does not fit NETSH_LAYOUT
+    odd = dump.replace("    BSSID 1                 : 00:1a:2b:3c:4d:5e\n",
+                       "    BSSID 1                 : 00:1a:2b:3c:4d:5e\n         Vendor             : Acme\n")
+    office, = [n for n in app.parse_netsh_networks(odd) if n["name"] == "Office WiFi 5G"]
+    assert (office["bssid"], office["signal"], office["channel"]) == ("00:1a:2b:3c:4d:5e", 61, 149)
+    assert len(app.parse_netsh_networks(odd)) == 7
@@ -0,0 +1,60 @@
+import os
+import struct
+
+import pytest
+
+import app
+import nl80211
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'nl80211')
+
+
+@pytest.fixture
+def client():
+    return nl80211.NL80211Client(nl80211.RecordedTransport(FIXTURES))
+
+
+def test_interfaces_skip_non_station(client):
+    assert client.interfaces() == [(3, 'wlan0'), (5, 'wlan1')]
+
+
+def test_scan_all_replays_each_radio_once(client):
+    networks = client.scan_all()
+    assert [(n["interface"], n["bssid"]) for n in networks] == [
+        (3, "a4:2b:b0:c1:7e:10"), (3, "00:1a:2b:3c:4d:5e"), (3, "f8:1a:67:22:90:03"),
+        (5, "a4:2b:b0:c1:7e:11"), (5, "c4:04:15:8a:11:b2"), (5, "02:11:22:33:44:55"), (5, "5c:a6:e6:01:02:03"),
+    ]
+
+
+def test_scan_parses_ssid_security_and_signal(client):
+    by_bssid = {n["bssid"]: n for n in client.scan_all()}
+    expected = {
+        "a4:2b:b0:c1:7e:10": ("HomeNetwork", "WPA2", "WPA2-Personal", 6, 82, True),
+        "00:1a:2b:3c:4d:5e": ("Office WiFi 5G", "WPA3", "WPA3-Personal", 149, 64, False),
+        "f8:1a:67:22:90:03": ("Coffee Shop Free WiFi", "Open", "Open", 11, 48, False),
+        "c4:04:15:8a:11:b2": ("NETGEAR_EXT", "WPA", "WPA-Personal", 1, 38, False),
+        "02:11:22:33:44:55": ("PrinterSetup", "WEP", "WEP", 6, 26, False),
+        "5c:a6:e6:01:02:03": ("CorpNet", "WPA2", "WPA2-Enterprise", 44, 58, False),
+    }
+    for bssid, (ssid, security, auth, channel, signal, active) in expected.items():
+        network = by_bssid[bssid]
+        assert (network["name"], network["security"], network["auth"], network["channel"],
+                network["signal"], network["active"]) == (ssid, security, auth, channel, signal, active)
+
+
+def test_recording_name_is_per_interface():
+    def index_attr(ifindex):
+        return nl80211.pack_attr(nl80211.NL80211_ATTR_IFINDEX, struct.pack('I', ifindex))
+    family = 0x1c
+    assert nl80211.recording_name(family, nl80211.NL80211_CMD_GET_SCAN, index_attr(3)) == 'get_scan-3.bin'
+    assert nl80211.recording_name(family, nl80211.NL80211_CMD_GET_SCAN, index_attr(5)) == 'get_scan-5.bin'
+    assert nl80211.recording_name(family, nl80211.NL80211_CMD_GET_INTERFACE) == 'get_interface.bin'
+    family_request = nl80211.pack_attr(nl80211.CTRL_ATTR_FAMILY_NAME, b'nl80211\x00')
+    assert nl80211.recording_name(nl80211.GENL_ID_CTRL, nl80211.CTRL_CMD_GETFAMILY, family_request) == 'get_family.bin'
+
+
+def test_scan_backend_current_network(client):
+    backend = app.NL80211ScanBackend(app.WiFiSecurityAnalyzer(), client)
+    current = backend.current_network()
+    assert (current["ssid"], current["bssid"], current["security"]) == ("HomeNetwork", "a4:2b:b0:c1:7e:10", "WPA2")
+    assert len(backend.nearby_networks()) == 7
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+import app
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'fixtures', 'probes', 'linux', 'nmcli_wifi_list.txt')
+
+
+def parse_fixture():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return app.parse_nmcli_terse(f.read())
+
+
+def test_escaped_colons_in_ssid_and_bssid():
+    networks = parse_fixture()
+    assert networks[0]["bssid"] == "a4:2b:b0:c1:7e:10"
+    assert networks[0]["active"] is True
+    assert [n["name"] for n in networks if "Coffee" in n["name"]] == ["Coffee Shop: Free WiFi"]
+
+
+def test_escaped_backslash_is_kept_once():
+    line = r"no:back\\slash\:x:AA\:BB\:CC\:DD\:EE\:FF:6:2437 MHz:54 Mbit/s:40:WPA2"
+    network, = app.parse_nmcli_terse(line)
+    assert network["name"] == "back\\slash:x"
+    assert network["bssid"] == "aa:bb:cc:dd:ee:ff"
+
+
+def test_hidden_ssid_and_numeric_fields():
+    hidden, = [n for n in parse_fixture() if n["bssid"] == "5c:a6:e6:01:02:03"]
+    assert hidden["name"] == "Unknown"
+    assert (hidden["channel"], hidden["frequency"], hidden["rate"], hidden["signal"]) == (44, 5220, 270, 19)
+
+
+@pytest.mark.parametrize("security", ["", "--"])
+def test_open_network_scores_the_same_for_empty_and_dashes(security):
+    line = f"no:Cafe:AA\\:BB\\:CC\\:DD\\:EE\\:FF:6:2437 MHz:54 Mbit/s:40:{security}"
+    network, = app.parse_nmcli_terse(line)
+    assert (network["security"], network["auth"]) == ("Open", "Open")
+    scored, = app.with_threat_scores([network])
+    assert scored["threat_score"] == app.THREAT_POINTS["unencrypted"]
+
+
+def test_malformed_lines_are_skipped():
+    assert app.parse_nmcli_terse("no:short:line\n\n") == []